@@ -0,0 +1,60 @@
+import random
+import time
+import tracemalloc
+
+from neat import config, stagnation
+
+from ReverseEncodingTree.evolution.bean.genome import GlobalGenome, create_near_new
+from ReverseEncodingTree.evolution.bean.species_set import StrongSpeciesSet
+from ReverseEncodingTree.evolution.methods import bi
+
+
+def obtain_population(genome_config, pop_size):
+    population = []
+    for key in range(pop_size):
+        genome = GlobalGenome(key)
+        genome.configure_new(genome_config)
+        for _ in range(10):
+            genome.mutate(genome_config)
+        population.append(genome)
+
+    return population
+
+
+def obtain_memory(genome_config, pop_size):
+    random.seed(2020)
+    tracemalloc.start()
+    population = obtain_population(genome_config, pop_size)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gene_count = sum([len(genome.nodes) + len(genome.connections) for genome in population])
+    return memory / pop_size, memory / gene_count
+
+
+def obtain_time(genome_config, pop_size, near_count):
+    random.seed(2020)
+    start_time = time.time()
+    population = obtain_population(genome_config, pop_size)
+    create_time = time.time() - start_time
+
+    start_time = time.time()
+    for index in range(near_count):
+        create_near_new(population[index % pop_size], genome_config, -1)
+    near_time = time.time() - start_time
+
+    return create_time / pop_size, near_time / near_count
+
+
+if __name__ == '__main__':
+    task_config = config.Config(GlobalGenome, bi.Reproduction, StrongSpeciesSet, stagnation.DefaultStagnation,
+                                "../configures/task/lunar-lander-v2.bi")
+
+    for gene_type in ["default", "compact"]:
+        task_config.genome_config.set_gene_type(gene_type)
+        genome_memory, gene_memory = obtain_memory(task_config.genome_config, 1000)
+        genome_time, near_time = obtain_time(task_config.genome_config, 1000, 10000)
+        print("gene type: " + gene_type)
+        print("memory per genome: {:.0f} bytes, memory per gene: {:.0f} bytes".format(genome_memory, gene_memory))
+        print("time per new genome: {:.1f} us, time per near genome: {:.1f} us".format(genome_time * 1e6,
+                                                                                         near_time * 1e6))
@@ -80,4 +80,11 @@ init_distance    = 2
 min_distance     = 0.1
 correlation_rate = -0.5
 search_count     = 30
-cluster_method   = kmeans++
\ No newline at end of file
+cluster_method   = kmeans++
+
+[FitDevice]
+# generations to reach the full fidelity, 0 means the full fidelity in all generations.
+fidelity_generation = 0
+start_episode_rate  = 0.2
+start_step_rate     = 0.2
+promotion_count     = 2
@@ -78,4 +78,11 @@ species_elitism      = 4
 
 [DefaultReproduction]
 elitism            = 2
-survival_threshold = 0.2
\ No newline at end of file
+survival_threshold = 0.2
+
+[FitDevice]
+# generations to reach the full fidelity, 0 means the full fidelity in all generations.
+fidelity_generation = 0
+start_episode_rate  = 0.2
+start_step_rate     = 0.2
+promotion_count     = 2
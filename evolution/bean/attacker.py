@@ -44,6 +44,103 @@ class CartPole_v0_Attacker(object):
         self.normal_min = normal_min
         self.gaussian_max = gaussian_peak
 
+        # random generator and preallocated buffers of the batched attack, see prepare_noise and attack_batch.
+        self.generator = numpy.random.default_rng()
+        self.noise_buffer = None
+        self.sign_buffer = None
+        self.attack_buffer = None
+        self.reverse_flags = None
+
+    def seed(self, seed=None):
+        """
+        set the random seed of the batched attack.
+
+        :param seed: random seed.
+        """
+        self.generator = numpy.random.default_rng(seed)
+        self.reverse_flags = None
+
+    def obtain_mask(self, shape, noise_level):
+        """
+        obtain the attack mask of the whole episode in advance.
+
+        :param shape: shape of mask, like (step,) or (step, batch).
+        :param noise_level: noise level, the probability of attack in each step.
+
+        :return: attack mask.
+        """
+        return self.generator.random(shape) < noise_level
+
+    def prepare_noise(self, step_count, shape):
+        """
+        generate the noise of the whole episode in the preallocated buffers.
+
+        :param step_count: number of steps in the episode.
+        :param shape: shape of the observations in each step, like (batch, observation).
+        """
+        shape = (step_count,) + tuple(shape)
+        if self.noise_buffer is None or self.noise_buffer.shape != shape:
+            self.noise_buffer = numpy.empty(shape)
+            self.sign_buffer = numpy.empty(shape)
+
+        if self.attack_type == AttackType.Normal:
+            self.generator.standard_normal(out=self.noise_buffer)
+            self.generator.random(out=self.sign_buffer)
+            # noise ~ N(normal_max, normal_min), added or subtracted with the same chance.
+            numpy.multiply(self.noise_buffer, self.normal_min, out=self.noise_buffer)
+            numpy.add(self.noise_buffer, self.normal_max, out=self.noise_buffer)
+            numpy.negative(self.noise_buffer, out=self.noise_buffer, where=self.sign_buffer < 0.5)
+        elif self.attack_type == AttackType.Gaussian:
+            self.generator.standard_normal(out=self.noise_buffer)
+            numpy.multiply(self.noise_buffer, self.gaussian_max, out=self.noise_buffer)
+
+    def attack_batch(self, original_observations, mask=None, step=None):
+        """
+        attack a batch of observations by requested attacker.
+
+        :param original_observations: original observations with shape (batch, observation).
+        :param mask: whether each observation requires attack with shape (batch,), None means all of them.
+        :param step: step of the noise generated by prepare_noise, None means generating the noise now.
+
+        :return: observations under attack, the buffer is reused in the next call.
+        """
+        original_observations = numpy.asarray(original_observations, dtype=float)
+        shape = original_observations.shape
+        if self.attack_buffer is None or self.attack_buffer.shape != shape:
+            self.attack_buffer = numpy.empty(shape)
+        if self.reverse_flags is None or len(self.reverse_flags) != shape[0]:
+            self.reverse_flags = numpy.ones(shape[0], dtype=bool)
+
+        if step is None and self.attack_type in [AttackType.Normal, AttackType.Gaussian]:
+            self.prepare_noise(1, shape)
+            step = 0
+
+        attack_observations = self.attack_buffer
+        if self.attack_type == AttackType.Normal:
+            numpy.add(original_observations, self.noise_buffer[step], out=attack_observations)
+        elif self.attack_type == AttackType.Reverse:
+            # reverse in every other attack of each observation.
+            reverse_flags = self.reverse_flags if mask is None else self.reverse_flags & mask
+            attack_observations[:] = original_observations
+            attack_observations[reverse_flags] = original_observations[reverse_flags, ::-1]
+            if mask is None:
+                numpy.logical_not(self.reverse_flags, out=self.reverse_flags)
+            else:
+                numpy.logical_xor(self.reverse_flags, mask, out=self.reverse_flags)
+        elif self.attack_type == AttackType.Gaussian:
+            numpy.add(self.noise_buffer[step], numpy.mean(original_observations, axis=1, keepdims=True),
+                      out=attack_observations)
+        elif self.attack_type == AttackType.Zerout:
+            attack_observations[:] = original_observations
+            attack_observations[:, : shape[1] - 1] = 0
+        else:
+            attack_observations[:] = original_observations
+
+        if mask is not None:
+            numpy.copyto(attack_observations, original_observations, where=numpy.logical_not(mask)[:, numpy.newaxis])
+
+        return attack_observations
+
     def attack(self, original_observation, need_attack=True):
         """
         attack by requested attacker.
@@ -0,0 +1,214 @@
+from enum import Enum
+
+import numpy
+
+
+class BatchType(Enum):
+    Full = 1
+    Fixed = 2
+    Rotating = 3
+
+
+class Dataset(object):
+
+    def __init__(self, inputs=None, outputs=None, batch_size=None, batch_type=BatchType.Full):
+        """
+        initialize the dataset of Supervised Learning.
+
+        :param inputs: inputs with shape (row, input), in memory or memory-mapped.
+        :param outputs: expected outputs with shape (row, output), in memory or memory-mapped.
+        :param batch_size: number of rows in each batch (None means the whole dataset).
+        :param batch_type: type of batch, BatchType.Full evaluates the whole dataset,
+                           BatchType.Fixed evaluates the first batch in all generations,
+                           BatchType.Rotating evaluates the consecutive batches, one batch per generation.
+        """
+        self.inputs = inputs
+        self.outputs = outputs
+        self.batch_size = batch_size
+        self.batch_type = batch_type if batch_size is not None else BatchType.Full
+
+        # files of the memory-mapped or streamed dataset, see load_npy and load_csv.
+        self.input_path = None
+        self.output_path = None
+        self.csv_path = None
+        self.output_count = None
+        self.delimiter = ","
+        self.skip_header = 0
+
+        # reader of the streamed dataset, the index is the batch read next.
+        self.reader = None
+        self.reader_index = 0
+
+        # the last obtained batch.
+        self.batch_index = None
+        self.batch = None
+
+    @classmethod
+    def load_npy(cls, input_path, output_path, batch_size=None, batch_type=BatchType.Rotating):
+        """
+        load the dataset from .npy files, the rows are memory-mapped and only the rows of batch are read.
+
+        :param input_path: path of the inputs with shape (row, input).
+        :param output_path: path of the expected outputs with shape (row, output).
+        :param batch_size: number of rows in each batch (None means the whole dataset).
+        :param batch_type: type of batch, see BatchType.
+
+        :return: dataset.
+        """
+        dataset = cls(batch_size=batch_size, batch_type=batch_type)
+        dataset.input_path = input_path
+        dataset.output_path = output_path
+        dataset._open_npy()
+        return dataset
+
+    @classmethod
+    def load_csv(cls, path, output_count, batch_size=None, batch_type=BatchType.Rotating,
+                 delimiter=",", skip_header=0):
+        """
+        load the dataset from the CSV file, the last columns of each row are the expected outputs.
+        If the batch size is set, the rows are streamed and only one batch is kept in memory.
+
+        :param path: path of the CSV file.
+        :param output_count: number of the expected outputs in each row.
+        :param batch_size: number of rows in each batch (None means the whole dataset).
+        :param batch_type: type of batch, see BatchType.
+        :param delimiter: delimiter of the values.
+        :param skip_header: number of the header lines.
+
+        :return: dataset.
+        """
+        dataset = cls(batch_size=batch_size, batch_type=batch_type)
+        dataset.output_count = output_count
+        dataset.delimiter = delimiter
+        dataset.skip_header = skip_header
+
+        if dataset.batch_type == BatchType.Full:
+            values = numpy.loadtxt(path, delimiter=delimiter, skiprows=skip_header, ndmin=2)
+            dataset.inputs = values[:, :-output_count]
+            dataset.outputs = values[:, -output_count:]
+        else:
+            dataset.csv_path = path
+
+        return dataset
+
+    def __getstate__(self):
+        """
+        obtain the picklable state of the dataset, the memory-mapped rows and the reader are opened again.
+
+        :return: state of dataset.
+        """
+        state = self.__dict__.copy()
+        if self.input_path is not None:
+            state["inputs"] = None
+            state["outputs"] = None
+        state["reader"] = None
+        state["reader_index"] = 0
+        state["batch_index"] = None
+        state["batch"] = None
+        return state
+
+    def obtain_index(self, generation):
+        """
+        obtain the index of batch in the generation.
+
+        :param generation: current generation.
+
+        :return: index of batch (None means the whole dataset).
+        """
+        if self.batch_type == BatchType.Full:
+            return None
+        elif self.batch_type == BatchType.Fixed:
+            return 0
+
+        return generation
+
+    def obtain_batch(self, index):
+        """
+        obtain the batch of the dataset.
+
+        :param index: index of batch, see obtain_index.
+
+        :return: inputs and expected outputs of the batch.
+        """
+        if self.batch is None or index != self.batch_index:
+            self.batch = self._load_batch(index)
+            self.batch_index = index
+
+        return self.batch
+
+    def _load_batch(self, index):
+        """
+        load the batch of the dataset.
+
+        :param index: index of batch.
+
+        :return: inputs and expected outputs of the batch.
+        """
+        if self.csv_path is not None:
+            return self._stream_csv(index)
+
+        if self.input_path is not None and self.inputs is None:
+            self._open_npy()
+
+        row_count = len(self.inputs)
+        if self.batch_type == BatchType.Full or self.batch_size >= row_count:
+            return numpy.asarray(self.inputs, dtype=float), numpy.asarray(self.outputs, dtype=float)
+
+        # the rotating batches wrap around the end of dataset.
+        rows = numpy.arange(index * self.batch_size, (index + 1) * self.batch_size) % row_count
+        if rows[0] < rows[-1]:
+            rows = slice(rows[0], rows[-1] + 1)
+
+        return numpy.asarray(self.inputs[rows], dtype=float), numpy.asarray(self.outputs[rows], dtype=float)
+
+    def _open_npy(self):
+        """
+        open the memory-mapped .npy files.
+        """
+        self.inputs = numpy.load(self.input_path, mmap_mode="r")
+        self.outputs = numpy.load(self.output_path, mmap_mode="r")
+        if len(self.inputs) != len(self.outputs):
+            raise Exception("the inputs and the expected outputs have different number of rows.")
+
+    def _read_row(self):
+        """
+        read the next row of the CSV file, the reader goes back to the first row at the end of file.
+
+        :return: values of row.
+        """
+        for _ in range(2):
+            if self.reader is not None:
+                for line in self.reader:
+                    if len(line.strip()) > 0:
+                        return line
+
+                self.reader.close()
+
+            self.reader = open(self.csv_path, "r", encoding="utf-8")
+            for _ in range(self.skip_header):
+                self.reader.readline()
+
+        raise Exception("no rows in " + self.csv_path + ".")
+
+    def _stream_csv(self, index):
+        """
+        stream the batch from the CSV file, the skipped batches are read without parsing.
+
+        :param index: index of batch.
+
+        :return: inputs and expected outputs of the batch.
+        """
+        if self.reader is None or index < self.reader_index:
+            if self.reader is not None:
+                self.reader.close()
+            self.reader = None
+            self.reader_index = 0
+
+        for _ in range((index - self.reader_index) * self.batch_size):
+            self._read_row()
+
+        lines = [self._read_row() for _ in range(self.batch_size)]
+        self.reader_index = index + 1
+
+        values = numpy.loadtxt(lines, delimiter=self.delimiter, ndmin=2)
+        return values[:, :-self.output_count], values[:, -self.output_count:]
@@ -0,0 +1,192 @@
+import math
+
+import numpy
+
+
+# noinspection PyPep8Naming
+class CartPole_v0_Environment(object):
+
+    def __init__(self, environment_count=1):
+        """
+        initialize the batch of independent CartPole v0 environments (same dynamics as the unwrapped gym version).
+
+        :param environment_count: number of environments stepped together.
+        """
+        self.gravity = 9.8
+        self.mass_cart = 1.0
+        self.mass_pole = 0.1
+        self.total_mass = self.mass_pole + self.mass_cart
+        # actually half the pole's length
+        self.length = 0.5
+        self.pole_mass_length = self.mass_pole * self.length
+        self.force_mag = 10.0
+        # seconds between state updates
+        self.tau = 0.02
+
+        # angle at which to fail the episode
+        self.theta_threshold_radians = 12 * 2 * math.pi / 360
+        self.x_threshold = 2.4
+
+        self.observation_size = 4
+        self.action_size = 2
+
+        self.environment_count = environment_count
+        self.random_state = numpy.random.RandomState()
+        self.state = None
+        self.done = None
+
+    def seed(self, seed=None):
+        """
+        set the random seed of the environments.
+
+        :param seed: random seed.
+
+        :return: seed list, like gym.
+        """
+        self.random_state = numpy.random.RandomState(seed)
+        return [seed]
+
+    def reset(self, environment_count=None):
+        """
+        reset all the environments.
+
+        :param environment_count: new number of environments (or None for keeping the current number).
+
+        :return: observations with shape (environment, 4).
+        """
+        if environment_count is not None:
+            self.environment_count = environment_count
+
+        self.state = self.random_state.uniform(low=-0.05, high=0.05, size=(self.environment_count, 4))
+        self.done = numpy.zeros(self.environment_count, dtype=bool)
+
+        return numpy.array(self.state)
+
+    def step(self, actions):
+        """
+        step all the environments by their actions.
+
+        :param actions: actions (0 or 1) with shape (environment,).
+
+        :return: observations, rewards, dones and information of all the environments.
+        """
+        x, x_dot, theta, theta_dot = self.state.T
+
+        force = numpy.where(numpy.asarray(actions) == 1, self.force_mag, -self.force_mag)
+        cos_theta = numpy.cos(theta)
+        sin_theta = numpy.sin(theta)
+        temp = (force + self.pole_mass_length * theta_dot * theta_dot * sin_theta) / self.total_mass
+        theta_acc = (self.gravity * sin_theta - cos_theta * temp) / \
+                    (self.length * (4.0 / 3.0 - self.mass_pole * cos_theta * cos_theta / self.total_mass))
+        x_acc = temp - self.pole_mass_length * theta_acc * cos_theta / self.total_mass
+
+        # euler kinematics integrator.
+        x = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * x_acc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * theta_acc
+        self.state = numpy.stack([x, x_dot, theta, theta_dot], axis=1)
+
+        done = (x < -self.x_threshold) | (x > self.x_threshold) | \
+               (theta < -self.theta_threshold_radians) | (theta > self.theta_threshold_radians)
+
+        # reward 1.0 until the step the pole just fell, 0.0 after that.
+        rewards = numpy.where(self.done, 0.0, 1.0)
+        self.done = self.done | done
+
+        return numpy.array(self.state), rewards, numpy.array(self.done), {}
+
+    def render(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class VectorEnvironment(object):
+
+    def __init__(self, environment_creator, environment_count=1):
+        """
+        initialize the batch of environments in gym library, they are stepped together like a vectorized environment.
+
+        :param environment_creator: creator of one environment, like partial(gym.make, "LunarLander-v2").
+        :param environment_count: number of environments stepped together.
+        """
+        self.environment_creator = environment_creator
+        self.environments = []
+        self.environment_count = environment_count
+        self.random_seed = None
+
+        self.observations = None
+        self.done = None
+
+    def _obtain_environment(self, index):
+        """
+        obtain the environment by index, the environments are created once and reused.
+
+        :param index: index of environment.
+
+        :return: environment.
+        """
+        while len(self.environments) <= index:
+            environment = self.environment_creator()
+            if self.random_seed is not None:
+                environment.seed(self.random_seed + len(self.environments))
+            self.environments.append(environment)
+
+        return self.environments[index]
+
+    def seed(self, seed=None):
+        """
+        set the random seed of the environments, each environment is seeded by seed + its index.
+
+        :param seed: random seed.
+
+        :return: seed list, like gym.
+        """
+        self.random_seed = seed
+        if seed is None:
+            return [environment.seed(None) for environment in self.environments]
+
+        return [environment.seed(seed + index) for index, environment in enumerate(self.environments)]
+
+    def reset(self, environment_count=None):
+        """
+        reset all the environments.
+
+        :param environment_count: new number of environments (or None for keeping the current number).
+
+        :return: observations with shape (environment, observation).
+        """
+        if environment_count is not None:
+            self.environment_count = environment_count
+
+        self.observations = numpy.array([numpy.asarray(self._obtain_environment(index).reset(), dtype=float)
+                                         for index in range(self.environment_count)])
+        self.done = numpy.zeros(self.environment_count, dtype=bool)
+
+        return numpy.array(self.observations)
+
+    def step(self, actions):
+        """
+        step all the environments by their actions, the done environments are not stepped again.
+
+        :param actions: actions with shape (environment,).
+
+        :return: observations, rewards, dones and information of all the environments.
+        """
+        rewards = numpy.zeros(self.environment_count)
+        for index in numpy.where(numpy.logical_not(self.done))[0]:
+            observation, reward, done, _ = self.environments[index].step(int(actions[index]))
+            self.observations[index] = observation
+            rewards[index] = reward
+            self.done[index] = done
+
+        return numpy.array(self.observations), rewards, numpy.array(self.done), {}
+
+    def render(self):
+        pass
+
+    def close(self):
+        for environment in self.environments:
+            environment.close()
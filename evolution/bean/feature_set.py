@@ -0,0 +1,379 @@
+import numpy
+from scipy import sparse
+
+
+class FeatureSet(object):
+
+    def __init__(self, capacity=16, pivot_count=0):
+        """
+        initialize the set of features stacked in one array, like the feature matrices of a population.
+        The sparse features are saved as the rows of CSR matrix.
+
+        :param capacity: initial number of rows in the array, it doubles when the set is full.
+        :param pivot_count: number of pivots (the first added features) for range queries, see has_within.
+        """
+        self.capacity = capacity
+        self.features = None
+        self.keys = []
+        self.indices = {}
+
+        # the sparse rows, their squared norms and the rows stacked in one CSR matrix (None when changed).
+        self.is_sparse = False
+        self.norms = None
+        self.stacked_features = None
+
+        # pairwise distances, the first complete_count rows (and columns) are calculated.
+        self.distances = None
+        self.complete_count = 0
+
+        # the pivots and the distances from all the features to them, the pivots are kept after removal.
+        self.pivot_count = pivot_count
+        self.pivot_set = FeatureSet(capacity=pivot_count) if pivot_count > 0 else None
+        self.pivot_distances = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.indices
+
+    def add(self, key, feature, distances=None):
+        """
+        add the feature into the set.
+
+        :param key: key of feature, like the genome.
+        :param feature: feature, like the feature matrix of genome.
+        :param distances: distances from the feature to all the features in the set (or None), see distances_to.
+        """
+        if key in self.indices:
+            self.remove(key)
+
+        feature = self._ravel(feature)
+        if self.distances is None:
+            self.is_sparse = sparse.issparse(feature)
+            if self.is_sparse:
+                self.features = []
+                self.norms = numpy.zeros(self.capacity, dtype=feature.dtype)
+            else:
+                self.features = numpy.zeros((self.capacity, feature.shape[-1]), dtype=feature.dtype)
+            self.distances = numpy.zeros((self.capacity, self.capacity), dtype=feature.dtype)
+            if self.pivot_set is not None:
+                self.pivot_distances = numpy.zeros((self.capacity, self.pivot_count), dtype=feature.dtype)
+        elif len(self.keys) == len(self.distances):
+            self._expand()
+
+        index = len(self.keys)
+        if self.is_sparse:
+            self.features.append(feature)
+            self.norms[index] = feature.multiply(feature).sum()
+            self.stacked_features = None
+        else:
+            self.features[index] = feature
+        self.keys.append(key)
+        self.indices[key] = index
+
+        # the distances are saved when all the previous distances are calculated.
+        if distances is not None and self.complete_count == index:
+            self.distances[index, :index] = distances
+            self.distances[:index, index] = distances
+            self.distances[index, index] = 0
+            self.complete_count += 1
+
+        if self.pivot_set is not None:
+            pivot_index = len(self.pivot_set)
+            if pivot_index < self.pivot_count:
+                # the first features become the pivots, the previous features are measured to the new pivot.
+                self.pivot_set.add(pivot_index, feature)
+                if index > 0:
+                    self.pivot_distances[:index, pivot_index] = self._obtain_distances(feature, index)
+            self.pivot_distances[index, :len(self.pivot_set)] = self.pivot_set.distances_to(feature)
+
+    def remove(self, key):
+        """
+        remove the feature from the set, the last feature is moved to its position.
+
+        :param key: key of feature.
+        """
+        index = self.indices.pop(key)
+        last_index = len(self.keys) - 1
+        if index != last_index:
+            last_key = self.keys[last_index]
+            self.keys[index] = last_key
+            self.indices[last_key] = index
+            self.features[index] = self.features[last_index]
+            if self.is_sparse:
+                self.norms[index] = self.norms[last_index]
+            if self.pivot_set is not None:
+                self.pivot_distances[index] = self.pivot_distances[last_index]
+            if last_index < self.complete_count:
+                self.distances[[index, last_index]] = self.distances[[last_index, index]]
+                self.distances[:, [index, last_index]] = self.distances[:, [last_index, index]]
+            else:
+                self.complete_count = min(self.complete_count, index)
+
+        self.keys.pop()
+        if self.is_sparse:
+            self.features.pop()
+            self.stacked_features = None
+        self.complete_count = min(self.complete_count, last_index)
+
+    def clear(self):
+        """
+        remove all the features.
+        """
+        self.keys = []
+        self.indices = {}
+        self.complete_count = 0
+        if self.is_sparse:
+            self.features = []
+            self.stacked_features = None
+
+    def distances_to(self, feature):
+        """
+        obtain the distances from the feature to all the features in the set.
+
+        :param feature: feature, like the feature matrix of genome.
+
+        :return: distances in the order of keys.
+        """
+        if len(self.keys) == 0:
+            return numpy.zeros(0)
+
+        return self._obtain_distances(self._ravel(feature), len(self.keys))
+
+    def distances_between(self, features):
+        """
+        obtain the distances from several features to all the features in the set at once,
+        they are calculated by the squared norms and one matrix product.
+
+        :param features: features, like the feature matrices of genomes.
+
+        :return: distances with shape (features, keys).
+        """
+        count = len(self.keys)
+        if count == 0:
+            return numpy.zeros((len(features), 0))
+
+        rows = [self._ravel(feature) for feature in features]
+        if len(rows) == 0:
+            return numpy.zeros((0, count))
+
+        if self.is_sparse:
+            if self.stacked_features is None:
+                self.stacked_features = sparse.vstack(self.features, format="csr")
+            stacked_rows = sparse.vstack(rows, format="csr")
+            products = stacked_rows.dot(self.stacked_features[:count].T).toarray()
+            norms = numpy.asarray(stacked_rows.multiply(stacked_rows).sum(axis=1)).ravel()
+            squares = norms[:, numpy.newaxis] + self.norms[:count] - 2 * products
+        else:
+            stacked_rows = numpy.stack(rows)
+            saved_features = self.features[:count]
+            squares = numpy.einsum("ij,ij->i", stacked_rows, stacked_rows)[:, numpy.newaxis] + \
+                numpy.einsum("ij,ij->i", saved_features, saved_features) - 2 * stacked_rows.dot(saved_features.T)
+
+        return numpy.sqrt(numpy.maximum(squares, 0))
+
+    def distances_from(self, key, feature, changes):
+        """
+        obtain the distances from the feature changed from a feature in the set to all the features in the set.
+        Only the changed cells are calculated, based on the cached distances of the original feature.
+
+        :param key: key of the original feature.
+        :param feature: changed feature.
+        :param changes: original values of the changed cells (flat position -> value), like feature_changes of genome.
+
+        :return: distances in the order of keys.
+        """
+        if self.is_sparse:
+            return self.distances_to(feature)
+
+        distances = self.distance_matrix()[self.indices[key]]
+        if len(changes) == 0:
+            return numpy.array(distances)
+
+        positions = numpy.fromiter(changes.keys(), dtype=int, count=len(changes))
+        original_values = numpy.fromiter(changes.values(), dtype=float, count=len(changes))
+        values = numpy.ravel(feature)[positions]
+        cells = self.features[:len(self.keys), positions]
+        squares = distances ** 2 + numpy.sum((values - cells) ** 2 - (original_values - cells) ** 2, axis=1)
+        return numpy.sqrt(numpy.maximum(squares, 0))
+
+    def min_distance(self, feature):
+        """
+        obtain the minimum distance from the feature to the features in the set.
+
+        :param feature: feature, like the feature matrix of genome.
+
+        :return: minimum distance (inf if the set is empty).
+        """
+        if len(self.keys) == 0:
+            return float("inf")
+
+        return float(numpy.min(self.distances_to(feature)))
+
+    def has_within(self, feature, radius):
+        """
+        check whether any feature in the set is nearer than the radius to the feature.
+        The features are filtered by the lower bounds of their distances from the pivots (triangle inequality),
+        only the remaining candidates are calculated.
+
+        :param feature: feature, like the feature matrix of genome.
+        :param radius: radius of the range query, like min_distance.
+
+        :return: whether any distance is less than the radius.
+        """
+        count = len(self.keys)
+        if count == 0:
+            return False
+
+        feature = self._ravel(feature)
+        if self.pivot_set is None:
+            return bool(numpy.min(self._obtain_distances(feature, count)) < radius)
+
+        pivot_count = len(self.pivot_set)
+        pivot_distances = self.pivot_set.distances_to(feature)
+        bounds = numpy.max(numpy.abs(self.pivot_distances[:count, :pivot_count] - pivot_distances), axis=1)
+
+        # the slack keeps the candidates whose bound is rounded over their distance.
+        candidates = numpy.where(bounds < radius * (1 + 1e-9))[0]
+        if len(candidates) == 0:
+            return False
+
+        return bool(numpy.min(self._obtain_distances(feature, candidates)) < radius)
+
+    def nearest(self, feature, count=1):
+        """
+        obtain the nearest features in the set.
+
+        :param feature: feature, like the feature matrix of genome.
+        :param count: number of the nearest features.
+
+        :return: keys and distances of the nearest features, from the nearest one.
+        """
+        distances = self.distances_to(feature)
+        count = min(count, len(distances))
+        if count == 0:
+            return [], numpy.zeros(0)
+
+        indices = numpy.argpartition(distances, count - 1)[:count]
+        indices = indices[numpy.argsort(distances[indices], kind="stable")]
+        return [self.keys[index] for index in indices], distances[indices]
+
+    def distance(self, key_1, key_2):
+        """
+        obtain the distance between two features in the set.
+
+        :param key_1: key of one feature.
+        :param key_2: key of another feature.
+
+        :return: distance.
+        """
+        index_1, index_2 = self.indices[key_1], self.indices[key_2]
+        if max(index_1, index_2) >= self.complete_count:
+            self.distance_matrix()
+
+        return float(self.distances[index_1, index_2])
+
+    def distance_matrix(self):
+        """
+        obtain the full pairwise distance matrix, only the distances of new features are calculated.
+
+        :return: distance matrix in the order of keys, which is a view of the cache and should not be modified.
+        """
+        count = len(self.keys)
+        for index in range(self.complete_count, count):
+            distances = self._obtain_distances(self.features[index], index)
+            self.distances[index, :index] = distances
+            self.distances[:index, index] = distances
+            self.distances[index, index] = 0
+        self.complete_count = count
+
+        if self.distances is None:
+            return numpy.zeros((0, 0))
+
+        return self.distances[:count, :count]
+
+    def condensed_distances(self):
+        """
+        obtain the condensed pairwise distances, like scipy.spatial.distance.pdist.
+
+        :return: distances of the upper triangle in row-major order.
+        """
+        count = len(self.keys)
+        return self.distance_matrix()[numpy.triu_indices(count, 1)]
+
+    def _ravel(self, feature):
+        """
+        flatten the feature into one row, the sparse feature is a CSR matrix with one row.
+
+        :param feature: feature, like the feature matrix of genome.
+
+        :return: flattened feature.
+        """
+        if sparse.issparse(feature):
+            feature = sparse.csr_matrix(feature.reshape((1, -1)))
+            if self.distances is None or self.is_sparse:
+                return feature
+            return feature.toarray().ravel()
+        elif self.is_sparse:
+            return sparse.csr_matrix(numpy.reshape(feature, (1, -1)))
+
+        return numpy.ravel(feature)
+
+    def _obtain_distances(self, feature, count):
+        """
+        obtain the distances from the flattened feature to the first features (or the chosen features) in the set.
+        The sparse distances are calculated by the squared norms and the dot products.
+
+        :param feature: flattened feature, see _ravel.
+        :param count: number of the first features, or the indices of the chosen features.
+
+        :return: distances.
+        """
+        rows = slice(0, count) if isinstance(count, int) else count
+        if self.is_sparse:
+            if self.stacked_features is None:
+                self.stacked_features = sparse.vstack(self.features, format="csr")
+            products = self.stacked_features[rows].dot(feature.T).toarray().ravel()
+            squares = self.norms[rows] + feature.multiply(feature).sum() - 2 * products
+            return numpy.sqrt(numpy.maximum(squares, 0))
+
+        differences = self.features[rows] - feature
+        return numpy.sqrt(numpy.einsum("ij,ij->i", differences, differences))
+
+    def _expand(self):
+        """
+        double the capacity of the arrays.
+        """
+        count = len(self.distances)
+        if self.is_sparse:
+            norms = numpy.zeros(count * 2, dtype=self.norms.dtype)
+            norms[:count] = self.norms
+            self.norms = norms
+        else:
+            features = numpy.zeros((count * 2, self.features.shape[1]), dtype=self.features.dtype)
+            features[:count] = self.features
+            self.features = features
+        distances = numpy.zeros((count * 2, count * 2), dtype=self.distances.dtype)
+        distances[:count, :count] = self.distances
+        self.distances = distances
+        if self.pivot_set is not None:
+            pivot_distances = numpy.zeros((count * 2, self.pivot_count), dtype=self.pivot_distances.dtype)
+            pivot_distances[:count] = self.pivot_distances
+            self.pivot_distances = pivot_distances
+
+    @staticmethod
+    def create(genomes, pivot_count=0):
+        """
+        create the feature set of genomes, the genomes are the keys.
+
+        :param genomes: genomes with feature matrix, like GlobalGenome.
+        :param pivot_count: number of pivots for range queries.
+
+        :return: feature set.
+        """
+        feature_set = FeatureSet(capacity=max(16, len(genomes)), pivot_count=pivot_count)
+        for genome in genomes:
+            feature_set.add(genome, genome.feature_matrix)
+
+        return feature_set
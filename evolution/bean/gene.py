@@ -0,0 +1,373 @@
+from collections.abc import MutableMapping
+from random import choice, random
+
+import numpy
+from neat.attributes import FloatAttribute, BoolAttribute
+from neat.genes import DefaultNodeGene, DefaultConnectionGene
+
+
+class CompactGene(object):
+    """
+    gene with slots, it has the same interface as neat.genes.BaseGene but no instance dictionary.
+    """
+    __slots__ = ("key",)
+
+    _gene_attributes = []
+
+    def __init__(self, key):
+        self.key = key
+
+    def __str__(self):
+        attrib = ['key'] + [a.name for a in self._gene_attributes]
+        attrib = ['{0}={1}'.format(a, getattr(self, a)) for a in attrib]
+        return '{0}({1})'.format(self.__class__.__name__, ", ".join(attrib))
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    @classmethod
+    def parse_config(cls, config, param_dict):
+        pass
+
+    @classmethod
+    def get_config_params(cls):
+        params = []
+        for a in cls._gene_attributes:
+            params += a.get_config_params()
+        return params
+
+    def init_attributes(self, config):
+        for a in self._gene_attributes:
+            setattr(self, a.name, a.init_value(config))
+
+    def mutate(self, config):
+        for a in self._gene_attributes:
+            setattr(self, a.name, a.mutate_value(getattr(self, a.name), config))
+
+    def copy(self):
+        new_gene = self.__class__.__new__(self.__class__)
+        new_gene.key = self.key
+        for a in self._gene_attributes:
+            setattr(new_gene, a.name, getattr(self, a.name))
+
+        return new_gene
+
+    def crossover(self, gene2):
+        """
+        create a new gene randomly inheriting attributes from its parents.
+
+        :param gene2: another parent gene.
+
+        :return: new gene.
+        """
+        assert self.key == gene2.key
+
+        new_gene = self.__class__.__new__(self.__class__)
+        new_gene.key = self.key
+        for a in self._gene_attributes:
+            if random() > 0.5:
+                setattr(new_gene, a.name, getattr(self, a.name))
+            else:
+                setattr(new_gene, a.name, getattr(gene2, a.name))
+
+        return new_gene
+
+
+class CompactNodeGene(CompactGene):
+    __slots__ = ("bias", "response", "activation", "aggregation")
+
+    _gene_attributes = DefaultNodeGene._gene_attributes
+
+    distance = DefaultNodeGene.distance
+
+    def __init__(self, key):
+        assert isinstance(key, int), "CompactNodeGene key must be an int, not {!r}".format(key)
+        self.key = key
+
+    def copy(self):
+        new_gene = CompactNodeGene.__new__(CompactNodeGene)
+        new_gene.key = self.key
+        new_gene.bias = self.bias
+        new_gene.response = self.response
+        new_gene.activation = self.activation
+        new_gene.aggregation = self.aggregation
+        return new_gene
+
+
+class CompactConnectionGene(CompactGene):
+    __slots__ = ("weight", "enabled")
+
+    _gene_attributes = DefaultConnectionGene._gene_attributes
+
+    distance = DefaultConnectionGene.distance
+
+    def __init__(self, key):
+        assert isinstance(key, tuple), "CompactConnectionGene key must be a tuple, not {!r}".format(key)
+        self.key = key
+
+    def copy(self):
+        new_gene = CompactConnectionGene.__new__(CompactConnectionGene)
+        new_gene.key = self.key
+        new_gene.weight = self.weight
+        new_gene.enabled = self.enabled
+        return new_gene
+
+
+def init_values(attribute, count, config):
+    """
+    create the initial values of one float attribute, like FloatAttribute.init_value.
+
+    :param attribute: float attribute of gene.
+    :param count: number of values.
+    :param config: genome config.
+
+    :return: initial values.
+    """
+    mean = getattr(config, attribute.init_mean_name)
+    stdev = getattr(config, attribute.init_stdev_name)
+    init_type = getattr(config, attribute.init_type_name).lower()
+    min_value = getattr(config, attribute.min_value_name)
+    max_value = getattr(config, attribute.max_value_name)
+
+    if ('gauss' in init_type) or ('normal' in init_type):
+        return numpy.clip(numpy.random.normal(mean, stdev, count), min_value, max_value)
+
+    if 'uniform' in init_type:
+        return numpy.random.uniform(max(min_value, mean - 2 * stdev), min(max_value, mean + 2 * stdev), count)
+
+    raise RuntimeError("Unknown init_type {!r} for {!s}".format(init_type, attribute.init_type_name))
+
+
+def mutate_values(attribute, values, config):
+    """
+    mutate the values of one attribute in all the genes at once, like the mutate_value of attribute.
+
+    :param attribute: attribute of gene.
+    :param values: values of the attribute, they are mutated in place.
+    :param config: genome config.
+    """
+    mutate_rate = getattr(config, attribute.mutate_rate_name)
+
+    if isinstance(attribute, FloatAttribute):
+        replace_rate = getattr(config, attribute.replace_rate_name)
+        rates = numpy.random.random(len(values))
+
+        mutated = rates < mutate_rate
+        if numpy.any(mutated):
+            mutate_power = getattr(config, attribute.mutate_power_name)
+            new_values = values[mutated] + numpy.random.normal(0.0, mutate_power, numpy.count_nonzero(mutated))
+            values[mutated] = numpy.clip(new_values, getattr(config, attribute.min_value_name),
+                                         getattr(config, attribute.max_value_name))
+
+        replaced = numpy.logical_not(mutated) & (rates < replace_rate + mutate_rate)
+        if numpy.any(replaced):
+            values[replaced] = init_values(attribute, numpy.count_nonzero(replaced), config)
+
+    elif isinstance(attribute, BoolAttribute):
+        mutate_rates = mutate_rate + numpy.where(values, getattr(config, attribute.rate_to_false_add_name),
+                                                 getattr(config, attribute.rate_to_true_add_name))
+        mutated = (mutate_rates > 0) & (numpy.random.random(len(values)) < mutate_rates)
+        if numpy.any(mutated):
+            values[mutated] = numpy.random.random(numpy.count_nonzero(mutated)) < 0.5
+
+    elif mutate_rate > 0:
+        options = getattr(config, attribute.options_name)
+        for index in range(len(values)):
+            if random() < mutate_rate:
+                values[index] = choice(options)
+
+
+class ArrayGene(object):
+    """
+    gene in the gene store, its attributes are read from and written to the arrays of store.
+    """
+    __slots__ = ("store", "key")
+
+    def __init__(self, store, key):
+        object.__setattr__(self, "store", store)
+        object.__setattr__(self, "key", key)
+
+    def __getattr__(self, name):
+        if name not in self.store.attribute_values:
+            raise AttributeError(name)
+
+        value = self.store.attribute_values[name][self.store.indices[self.key]]
+        if isinstance(value, numpy.generic):
+            return value.item()
+        return value
+
+    def __setattr__(self, name, value):
+        if name not in self.store.attribute_values:
+            raise AttributeError(name)
+
+        self.store.attribute_values[name][self.store.indices[self.key]] = value
+
+    def __str__(self):
+        return str(self.copy())
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def mutate(self, config):
+        for a in self.store.gene_type._gene_attributes:
+            setattr(self, a.name, a.mutate_value(getattr(self, a.name), config))
+
+    def copy(self):
+        new_gene = self.store.gene_type(self.key)
+        for a in self.store.gene_type._gene_attributes:
+            setattr(new_gene, a.name, getattr(self, a.name))
+
+        return new_gene
+
+    def crossover(self, gene2):
+        return self.copy().crossover(gene2)
+
+    def distance(self, other, config):
+        return self.store.gene_type.distance(self, other, config)
+
+
+class GeneStore(MutableMapping):
+    """
+    genes saved in parallel arrays (one array for the keys and one array for each attribute),
+    it has the interface of the gene dictionary in genome, and the genes are kept in the order of insertion.
+    """
+    gene_type = None
+    key_shape = ()
+
+    def __init__(self, capacity=8):
+        self.indices = {}
+        self.count = 0
+        self.key_values = numpy.zeros((capacity,) + self.key_shape, dtype=int)
+        self.attribute_values = {}
+        for a in self.gene_type._gene_attributes:
+            if isinstance(a, FloatAttribute):
+                self.attribute_values[a.name] = numpy.zeros(capacity)
+            elif isinstance(a, BoolAttribute):
+                self.attribute_values[a.name] = numpy.zeros(capacity, dtype=bool)
+            else:
+                self.attribute_values[a.name] = numpy.zeros(capacity, dtype=object)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.indices)
+
+    def __contains__(self, key):
+        return key in self.indices
+
+    def __getitem__(self, key):
+        if key not in self.indices:
+            raise KeyError(key)
+
+        return ArrayGene(self, key)
+
+    def __setitem__(self, key, gene):
+        index = self.indices.get(key)
+        if index is None:
+            if self.count == len(self.key_values):
+                self._expand()
+            index = self.count
+            self.indices[key] = index
+            self.key_values[index] = key
+            self.count += 1
+
+        for name, values in self.attribute_values.items():
+            values[index] = getattr(gene, name)
+
+    def __delitem__(self, key):
+        index = self.indices.pop(key)
+
+        # the following genes are moved forward to keep the order of insertion.
+        self.key_values[index: self.count - 1] = self.key_values[index + 1: self.count]
+        for values in self.attribute_values.values():
+            values[index: self.count - 1] = values[index + 1: self.count]
+        self.count -= 1
+
+        for other_key, other_index in self.indices.items():
+            if other_index > index:
+                self.indices[other_key] = other_index - 1
+
+    def copy(self):
+        """
+        copy the gene store, each array is copied once.
+
+        :return: copied gene store.
+        """
+        store = self.__class__.__new__(self.__class__)
+        store.indices = dict(self.indices)
+        store.count = self.count
+        store.key_values = self.key_values.copy()
+        store.attribute_values = {name: values.copy() for name, values in self.attribute_values.items()}
+        return store
+
+    def obtain_keys(self):
+        """
+        obtain the keys of genes.
+
+        :return: keys in the order of genes.
+        """
+        return self.key_values[:self.count]
+
+    def obtain_values(self, name):
+        """
+        obtain the values of one attribute in all the genes.
+
+        :param name: name of attribute.
+
+        :return: values in the order of genes, which is a view of the array.
+        """
+        return self.attribute_values[name][:self.count]
+
+    def mutate(self, config):
+        """
+        mutate all the genes at once.
+
+        :param config: genome config.
+        """
+        for a in self.gene_type._gene_attributes:
+            mutate_values(a, self.attribute_values[a.name][:self.count], config)
+
+    def _expand(self):
+        """
+        double the capacity of the arrays.
+        """
+        capacity = len(self.key_values) * 2
+        keys = numpy.zeros((capacity,) + self.key_shape, dtype=int)
+        keys[:self.count] = self.key_values[:self.count]
+        self.key_values = keys
+        for name, values in self.attribute_values.items():
+            new_values = numpy.zeros(capacity, dtype=values.dtype)
+            new_values[:self.count] = values[:self.count]
+            self.attribute_values[name] = new_values
+
+
+class NodeStore(GeneStore):
+    gene_type = CompactNodeGene
+
+    def obtain_rows(self, keys, input_keys):
+        """
+        obtain the rows of nodes in the feature matrix, the inputs are placed first, and then the genes in order.
+
+        :param keys: array of node keys in any shape.
+        :param input_keys: keys of input nodes.
+
+        :return: rows of nodes in the same shape (-1 if the node does not exist).
+        """
+        keys = numpy.asarray(keys, dtype=int)
+        all_keys = numpy.concatenate([numpy.asarray(input_keys, dtype=int), self.obtain_keys()])
+        if all_keys.size == 0 or keys.size == 0:
+            return numpy.full(keys.shape, -1, dtype=int)
+
+        # the lookup table has one more cell (-1) for the keys out of range.
+        low, high = all_keys.min(), all_keys.max()
+        lookup = numpy.full(high - low + 2, -1, dtype=int)
+        lookup[all_keys - low] = numpy.arange(len(all_keys))
+        positions = keys - low
+        positions[(positions < 0) | (positions > high - low)] = high - low + 1
+        return lookup[positions]
+
+
+class ConnectionStore(GeneStore):
+    gene_type = CompactConnectionGene
+    key_shape = (2,)
@@ -2,6 +2,8 @@ import copy
 import random
 
 import math
+import numpy
+from scipy import sparse
 from neat.activations import ActivationFunctionSet
 from neat.aggregations import AggregationFunctionSet
 from neat.config import ConfigParameter
@@ -10,6 +12,9 @@ from neat.genome import DefaultGenome
 from neat.genome import DefaultGenomeConfig
 from neat.six_util import iteritems, itervalues
 
+from ReverseEncodingTree.evolution.bean.gene import CompactNodeGene, CompactConnectionGene
+from ReverseEncodingTree.evolution.bean.gene import GeneStore, NodeStore, ConnectionStore
+
 
 def create_center_new(feature_matrix_1, feature_matrix_2, config, key):
     """
@@ -22,13 +27,8 @@ def create_center_new(feature_matrix_1, feature_matrix_2, config, key):
 
     :return: center genome.
     """
-    new_feature_matrix = []
-    for row_1, row_2 in zip(feature_matrix_1, feature_matrix_2):
-        new_row = []
-        for value_1, value_2 in zip(row_1, row_2):
-            new_row.append((value_1 + value_2) / 2.0)
-
-        new_feature_matrix.append(new_row)
+    feature_matrix_1, feature_matrix_2 = obtain_matrices(feature_matrix_1, feature_matrix_2)
+    new_feature_matrix = (feature_matrix_1 + feature_matrix_2) / 2.0
 
     new_genome = GlobalGenome(key)
     new_genome.feature_matrix_new(new_feature_matrix, config)
@@ -47,14 +47,8 @@ def create_golden_section_new(feature_matrix_1, feature_matrix_2, config, key):
 
     :return: center genome.
     """
-
-    new_feature_matrix = []
-    for row_1, row_2 in zip(feature_matrix_1, feature_matrix_2):
-        new_row = []
-        for value_1, value_2 in zip(row_1, row_2):
-            new_row.append(value_1 + (value_2 - value_1) * ((3 - math.sqrt(5)) / 2))
-
-        new_feature_matrix.append(new_row)
+    feature_matrix_1, feature_matrix_2 = obtain_matrices(feature_matrix_1, feature_matrix_2)
+    new_feature_matrix = feature_matrix_1 + (feature_matrix_2 - feature_matrix_1) * ((3 - math.sqrt(5)) / 2)
 
     new_genome = GlobalGenome(key)
     new_genome.feature_matrix_new(new_feature_matrix, config)
@@ -72,11 +66,9 @@ def create_near_new(genome, config, key):
 
     :return: the new genome.
     """
-    new_genome = copy.deepcopy(genome)
-    new_genome.key = key
-    new_genome.fitness = None
+    new_genome = genome.clone(key)
+    new_genome.track_feature_changes()
     new_genome.mutate(config)
-    new_genome.set_feature_matrix(config)
     return new_genome
     # while True:
     #     new_genome = copy.deepcopy(genome)
@@ -103,6 +95,21 @@ def create_check(genome):
     return True
 
 
+def obtain_matrices(matrix_1, matrix_2):
+    """
+    obtain two matrices in the same format, they are sparse if one of them is sparse.
+
+    :param matrix_1: one matrix (dense, nested list or sparse).
+    :param matrix_2: another matrix (dense, nested list or sparse).
+
+    :return: two matrices.
+    """
+    if sparse.issparse(matrix_1) or sparse.issparse(matrix_2):
+        return sparse.csr_matrix(matrix_1), sparse.csr_matrix(matrix_2)
+
+    return numpy.asarray(matrix_1), numpy.asarray(matrix_2)
+
+
 def distance_between_two_matrices(matrix_1, matrix_2):
     """
     obtain the distance between two matrices.
@@ -112,12 +119,11 @@ def distance_between_two_matrices(matrix_1, matrix_2):
 
     :return: the distance.
     """
-    distance = 0
-    for row_1, row_2 in zip(matrix_1, matrix_2):
-        for value_1, value_2 in zip(row_1, row_2):
-            distance += math.pow(value_1 - value_2, 2)
+    matrix_1, matrix_2 = obtain_matrices(matrix_1, matrix_2)
+    if sparse.issparse(matrix_1):
+        return float(numpy.linalg.norm((matrix_1 - matrix_2).data))
 
-    return math.sqrt(distance)
+    return float(numpy.linalg.norm(matrix_1 - matrix_2))
 
 
 # noinspection PyMissingConstructor
@@ -149,7 +155,11 @@ class GlobalGenomeConfig(DefaultGenomeConfig):
                         ConfigParameter('node_delete_prob', float),
                         ConfigParameter('single_structural_mutation', bool, 'false'),
                         ConfigParameter('structural_mutation_surer', str, 'default'),
-                        ConfigParameter('initial_connection', str, 'unconnected')]
+                        ConfigParameter('initial_connection', str, 'unconnected'),
+                        ConfigParameter('feature_dtype', str, 'float64'),
+                        ConfigParameter('feature_format', str, 'dense'),
+                        ConfigParameter('gene_type', str, 'default'),
+                        ConfigParameter('lazy_genes', bool, 'false')]
 
         # Gather configuration data from the gene classes.
         self.node_gene_type = params['node_gene_type']
@@ -180,6 +190,17 @@ class GlobalGenomeConfig(DefaultGenomeConfig):
 
         assert self.initial_connection in DefaultGenomeConfig.allowed_connectivity
 
+        # Verify feature_dtype is valid.
+        if self.feature_dtype not in ['float32', 'float64']:
+            raise RuntimeError("Invalid feature_dtype {!r}".format(self.feature_dtype))
+
+        # Verify feature_format is valid, the sparse feature matrix is saved in CSR format.
+        if self.feature_format not in ['dense', 'sparse']:
+            raise RuntimeError("Invalid feature_format {!r}".format(self.feature_format))
+
+        # Verify gene_type is valid, the compact genes have slots instead of instance dictionaries.
+        self.set_gene_type(self.gene_type)
+
         # Verify structural_mutation_surer is valid.
         if self.structural_mutation_surer.lower() in ['1', 'yes', 'true', 'on']:
             self.structural_mutation_surer = 'true'
@@ -194,6 +215,22 @@ class GlobalGenomeConfig(DefaultGenomeConfig):
 
         self.node_indexer = None
 
+    def set_gene_type(self, gene_type):
+        """
+        set the type of node and connection genes.
+
+        :param gene_type: 'default' (genes in neat-python), 'compact' (genes with slots)
+                          or 'array' (genes saved in the arrays of NodeStore and ConnectionStore).
+        """
+        if gene_type == 'default':
+            self.node_gene_type, self.connection_gene_type = DefaultNodeGene, DefaultConnectionGene
+        elif gene_type in ['compact', 'array']:
+            self.node_gene_type, self.connection_gene_type = CompactNodeGene, CompactConnectionGene
+        else:
+            raise RuntimeError("Invalid gene_type {!r}".format(gene_type))
+
+        self.gene_type = gene_type
+
 
 class GlobalGenome(DefaultGenome):
 
@@ -203,15 +240,184 @@ class GlobalGenome(DefaultGenome):
         return GlobalGenomeConfig(param_dict)
 
     def __init__(self, key):
+        # the config to create the genes from the feature matrix (None if the genes are created), see create_genes.
+        self.pending_config = None
         super().__init__(key)
-        self.feature_matrix = None
+        # the feature matrix is created from the genes on first access, see feature_matrix.
+        self._feature_matrix = None
+        self.genome_config = None
+        # node key -> row of the feature matrix created from the genes (None if the matrix cannot be patched),
+        # and original values of the patched cells (flat position -> value) since the changes are tracked.
+        self.feature_rows = None
+        self.feature_changes = None
+        # revision of genes, it increases in each mutation.
+        self.revision = 0
+
+    @property
+    def feature_matrix(self):
+        """
+        obtain the feature matrix, it is created by the genome config if the genes are changed.
+
+        :return: feature matrix (or None if the genome is not configured).
+        """
+        if self._feature_matrix is None and self.genome_config is not None:
+            self.set_feature_matrix(self.genome_config)
+
+        return self._feature_matrix
+
+    @feature_matrix.setter
+    def feature_matrix(self, feature_matrix):
+        self._feature_matrix = feature_matrix
+
+    @property
+    def nodes(self):
+        """
+        obtain the node genes, they are created from the feature matrix if they are pending.
+
+        :return: node genes.
+        """
+        if self.pending_config is not None:
+            self.create_genes(self.pending_config)
+
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, nodes):
+        self._nodes = nodes
+
+    @property
+    def connections(self):
+        """
+        obtain the connection genes, they are created from the feature matrix if they are pending.
+
+        :return: connection genes.
+        """
+        if self.pending_config is not None:
+            self.create_genes(self.pending_config)
+
+        return self._connections
+
+    @connections.setter
+    def connections(self, connections):
+        self._connections = connections
+
+    def __getstate__(self):
+        """
+        obtain the picklable state of the genome, the feature matrix and the genes are created before
+        and the config is dropped.
+
+        :return: state of genome.
+        """
+        if self.pending_config is not None:
+            self.create_genes(self.pending_config)
+
+        state = self.__dict__.copy()
+        state["_feature_matrix"] = self.feature_matrix
+        state["genome_config"] = None
+        return state
+
+    def __setstate__(self, state):
+        """
+        set the state of the genome, the genomes saved by the previous versions are converted.
+
+        :param state: state of genome.
+        """
+        for name in ["feature_matrix", "nodes", "connections"]:
+            if name in state:
+                state["_" + name] = state.pop(name)
+
+        self.__dict__.update({"_feature_matrix": None, "genome_config": None, "feature_rows": None,
+                              "feature_changes": None, "revision": 0, "pending_config": None})
+        self.__dict__.update(state)
+
+    def __deepcopy__(self, memo):
+        """
+        copy the genome deeply, the genome config is shared.
+
+        :param memo: memo of the copied objects.
+
+        :return: copied genome.
+        """
+        if self.genome_config is not None:
+            memo[id(self.genome_config)] = self.genome_config
+
+        genome = self.__class__.__new__(self.__class__)
+        memo[id(self)] = genome
+        for name, value in self.__dict__.items():
+            genome.__dict__[name] = copy.deepcopy(value, memo)
+
+        return genome
+
+    def clone(self, key):
+        """
+        create a copy of the genome without fitness, the genes are copied by their attributes (the pending genes
+        are still pending), the feature matrix is copied by one array copy and the genome config is shared.
+
+        :param key: key of the new genome.
+
+        :return: copied genome.
+        """
+        genome = self.__class__.__new__(self.__class__)
+        genome.__dict__.update(self.__dict__)
+        genome.key = key
+        genome.fitness = None
+        if isinstance(self._nodes, GeneStore):
+            genome.nodes, genome.connections = self._nodes.copy(), self._connections.copy()
+        else:
+            genome.nodes = {node_key: node_gene.copy() for node_key, node_gene in iteritems(self._nodes)}
+            genome.connections = {connection_key: connection_gene.copy()
+                                  for connection_key, connection_gene in iteritems(self._connections)}
+        if self._feature_matrix is not None:
+            genome._feature_matrix = self._feature_matrix.copy()
+        if self.feature_rows is not None:
+            genome.feature_rows = dict(self.feature_rows)
+        genome.feature_changes = None
+
+        return genome
+
+    def invalidate_feature_matrix(self, config):
+        """
+        mark the feature matrix as changed, it is created again on next access.
+
+        :param config: genome config.
+        """
+        if self.pending_config is not None:
+            self.create_genes(self.pending_config)
+
+        self._feature_matrix = None
+        self.genome_config = config
+        self.feature_rows = None
+        self.feature_changes = None
+
+    def track_feature_changes(self):
+        """
+        start tracking the changed cells of the feature matrix, see feature_changes.
+        """
+        if self.feature_rows is not None and self._feature_matrix is not None:
+            self.feature_changes = {}
+        else:
+            self.feature_changes = None
+
+    def configure_genes(self, config):
+        """
+        move the genes into the gene stores if the gene type is 'array'.
+
+        :param config: genome config.
+        """
+        if config.gene_type == 'array' and not isinstance(self.nodes, GeneStore):
+            nodes, connections = NodeStore(), ConnectionStore()
+            nodes.update(self.nodes)
+            connections.update(self.connections)
+            self.nodes, self.connections = nodes, connections
 
     def configure_new(self, config):
         """
-        create new genome by configure, and then create the feature matrix.
+        create new genome by configure, the feature matrix is created on first access.
 
         :param config: genome config.
         """
+        self.configure_genes(config)
+
         # create node genes for the output pins.
         for node_key in config.output_keys:
             self.nodes[node_key] = self.create_node(config, node_key)
@@ -227,8 +433,20 @@ class GlobalGenome(DefaultGenome):
             connection = self.create_connection(config, input_id, output_id)
             self.connections[connection.key] = connection
 
-        # add feature matrix
-        self.set_feature_matrix(config)
+        # feature matrix is changed.
+        self.invalidate_feature_matrix(config)
+
+    def configure_crossover(self, genome1, genome2, config):
+        """
+        create new genome by crossover from two parent genomes, the feature matrix is created on first access.
+
+        :param genome1: one parent genome.
+        :param genome2: another parent genome.
+        :param config: genome config.
+        """
+        self.configure_genes(config)
+        super().configure_crossover(genome1, genome2, config)
+        self.invalidate_feature_matrix(config)
 
     @staticmethod
     def compute_connections(config):
@@ -272,33 +490,71 @@ class GlobalGenome(DefaultGenome):
     def feature_matrix_new(self, feature_matrix, config):
         """
         create new genome by feature matrix.
+        If lazy_genes is set, the hidden nodes and connections are created on first access of genes,
+        so the genomes only used by their feature matrices (like the rejected candidates) do not create them.
 
-        :param feature_matrix: obtained feature matrix.
+        :param feature_matrix: obtained feature matrix (dense, nested list or sparse).
         :param config: genome config
         """
+        if config.feature_format == 'sparse':
+            feature_matrix = sparse.csr_matrix(feature_matrix, dtype=config.feature_dtype)
+        else:
+            if sparse.issparse(feature_matrix):
+                feature_matrix = feature_matrix.toarray()
+            feature_matrix = numpy.array(feature_matrix, dtype=config.feature_dtype)
         self.feature_matrix = feature_matrix
+        self.configure_genes(config)
 
-        # create node genes for the output pins.
+        # create node genes for the output pins, their attributes are initialized randomly at once.
         for node_key in config.output_keys:
             self.nodes[node_key] = self.create_node(config, node_key)
 
+        # the connections are keyed by the positions of matrix, so the matrix cannot be patched.
+        self.genome_config = config
+        self.feature_rows = None
+        self.feature_changes = None
+
+        if config.lazy_genes:
+            self.pending_config = config
+        else:
+            self.create_genes(config)
+
+    def create_genes(self, config):
+        """
+        create the hidden nodes and connections by the feature matrix.
+
+        :param config: genome config.
+        """
+        self.pending_config = None
+
+        feature_matrix = self._feature_matrix
+        if sparse.issparse(feature_matrix):
+            biases = feature_matrix[:, 0].toarray().ravel()
+            weight_matrix = feature_matrix[:, 1:].tocoo()
+            order = numpy.lexsort((weight_matrix.col, weight_matrix.row))
+            positions = numpy.stack([weight_matrix.row[order], weight_matrix.col[order]], axis=1)
+            weights = weight_matrix.data[order]
+            positions, weights = positions[weights > 0], weights[weights > 0]
+        else:
+            biases = feature_matrix[:, 0]
+            positions = numpy.argwhere(feature_matrix[:, 1:] > 0)
+            weights = feature_matrix[positions[:, 0], positions[:, 1] + 1]
+
         # add hidden nodes by feature matrix if requested.
         for node_key in range(config.num_hidden):
-            node = DefaultNodeGene(node_key)
-            node.bias = feature_matrix[node_key + config.num_inputs][0]
+            node = config.node_gene_type(node_key)
+            node.bias = float(biases[node_key + config.num_inputs])
             node.response = config.response_init_mean
             node.activation = config.activation_default
             node.aggregation = config.aggregation_default
             self.nodes[node_key] = node
 
         # set connections by feature matrix.
-        for in_index in range(len(feature_matrix)):
-            for out_index in range(1, len(feature_matrix[in_index])):
-                if feature_matrix[in_index][out_index] > 0:
-                    connection = DefaultConnectionGene((in_index, out_index - 1))
-                    connection.weight = feature_matrix[in_index][out_index]
-                    connection.enabled = config.enabled_default
-                    self.connections[connection.key] = connection
+        for (in_index, out_index), weight in zip(positions, weights):
+            connection = config.connection_gene_type((int(in_index), int(out_index)))
+            connection.weight = float(weight)
+            connection.enabled = config.enabled_default
+            self.connections[connection.key] = connection
 
     def set_feature_matrix(self, config):
         """
@@ -306,27 +562,95 @@ class GlobalGenome(DefaultGenome):
 
         :param config: genome config.
         """
-        # bia + weight
-        self.feature_matrix = [[0 for _ in range(config.max_node_num + 1)] for _ in range(config.max_node_num)]
-
         # position mapping of feature matrix
         mapping = {}
         for index in range(config.num_inputs):
             mapping[index - config.num_inputs] = index
 
-        # add node bias
+        # node bias
         index = config.num_inputs
-        for node_key, node_gene in iteritems(self.nodes):
-            self.feature_matrix[index][0] = node_gene.bias
+        for node_key in self.nodes:
             mapping[node_key] = index
             index += 1
 
-        # add connect weight
+        # bia + weight
+        rows, cols, values = self.obtain_feature_cells(mapping, config)
+        shape = (config.max_node_num, config.max_node_num + 1)
+        if config.feature_format == 'sparse':
+            self.feature_matrix = sparse.csr_matrix((values, (rows, cols)), shape=shape, dtype=config.feature_dtype)
+            self.feature_matrix.eliminate_zeros()
+            self.feature_rows = None
+        else:
+            self.feature_matrix = numpy.zeros(shape, dtype=config.feature_dtype)
+            self.feature_matrix[rows, cols] = values
+            self.feature_rows = mapping
+        self.feature_changes = None
+        self.genome_config = config
+
+    def obtain_feature_cells(self, mapping, config):
+        """
+        obtain the cells of node biases (first column) and connect weights in the feature matrix.
+
+        :param mapping: position mapping from node key to row.
+        :param config: genome config.
+
+        :return: rows, columns and values of the cells.
+        """
+        if isinstance(self.nodes, GeneStore):
+            # the rows are the same as the mapping: inputs in order of key, and then the nodes in order.
+            node_rows = numpy.arange(config.num_inputs, config.num_inputs + len(self.nodes))
+            connection_rows = self.nodes.obtain_rows(self.connections.obtain_keys(), range(-config.num_inputs, 0))
+            in_rows, out_rows = connection_rows[:, 0], connection_rows[:, 1]
+            found = (in_rows >= 0) & (out_rows >= 0)
+            rows = numpy.concatenate([node_rows, in_rows[found]])
+            cols = numpy.concatenate([numpy.zeros(len(node_rows), dtype=int), out_rows[found] + 1])
+            values = numpy.concatenate([self.nodes.obtain_values("bias"),
+                                        self.connections.obtain_values("weight")[found]])
+            return rows, cols, values
+
+        rows, cols, values = [], [], []
+        for node_key, node_gene in iteritems(self.nodes):
+            rows.append(mapping[node_key])
+            cols.append(0)
+            values.append(node_gene.bias)
+
         for connect_gene in itervalues(self.connections):
-            if mapping.get(connect_gene.key[0]) is not None and mapping.get(connect_gene.key[1]) is not None:
-                row = mapping.get(connect_gene.key[0])
-                col = mapping.get(connect_gene.key[1]) + 1
-                self.feature_matrix[row][col] = connect_gene.weight
+            in_row, out_row = mapping.get(connect_gene.key[0]), mapping.get(connect_gene.key[1])
+            if in_row is not None and out_row is not None:
+                rows.append(in_row)
+                cols.append(out_row + 1)
+                values.append(connect_gene.weight)
+
+        return numpy.array(rows, dtype=int), numpy.array(cols, dtype=int), numpy.array(values, dtype=float)
+
+    def patch_feature_matrix(self, config):
+        """
+        patch the changed biases and weights into the feature matrix, the rows of nodes are not rebuilt.
+
+        :param config: genome config.
+        """
+        rows, cols, values = self.obtain_feature_cells(self.feature_rows, config)
+        values = values.astype(self._feature_matrix.dtype)
+        changed = numpy.where(self._feature_matrix[rows, cols] != values)[0]
+        self.patch_cells(rows[changed], cols[changed], values[changed])
+
+    def patch_cells(self, rows, cols, values):
+        """
+        patch the cells of the feature matrix, and save their original values if the changes are tracked.
+
+        :param rows: rows of the cells.
+        :param cols: columns of the cells.
+        :param values: new values of the cells.
+        """
+        if len(rows) == 0:
+            return
+
+        if self.feature_changes is not None:
+            positions = numpy.asarray(rows) * self._feature_matrix.shape[1] + numpy.asarray(cols)
+            for position, value in zip(positions.tolist(), self._feature_matrix[rows, cols].tolist()):
+                self.feature_changes.setdefault(position, value)
+
+        self._feature_matrix[rows, cols] = values
 
     def distance(self, other, config):
         """
@@ -342,6 +666,60 @@ class GlobalGenome(DefaultGenome):
 
         return distance_between_two_matrices(self.feature_matrix, other.feature_matrix)
 
+    def mutate(self, config):
+        """
+        mutate the genome, and then update the revision of genes and the feature matrix.
+        The changed cells are patched if the matrix is created from the genes and no node is deleted,
+        otherwise the matrix is marked as changed.
+
+        :param config: genome config.
+        """
+        if isinstance(self.connections, GeneStore):
+            # all the connection (node) genes are mutated at once.
+            self.mutate_structure(config)
+            self.connections.mutate(config)
+            self.nodes.mutate(config)
+        else:
+            super().mutate(config)
+        self.revision += 1
+        if self.feature_rows is not None and self._feature_matrix is not None:
+            self.patch_feature_matrix(config)
+        else:
+            self.invalidate_feature_matrix(config)
+
+    def mutate_structure(self, config):
+        """
+        mutate the structure of genome, like the first part of DefaultGenome.mutate.
+
+        :param config: genome config.
+        """
+        if config.single_structural_mutation:
+            div = max(1, (config.node_add_prob + config.node_delete_prob +
+                          config.conn_add_prob + config.conn_delete_prob))
+            r = random.random()
+            if r < (config.node_add_prob / div):
+                self.mutate_add_node(config)
+            elif r < ((config.node_add_prob + config.node_delete_prob) / div):
+                self.mutate_delete_node(config)
+            elif r < ((config.node_add_prob + config.node_delete_prob +
+                       config.conn_add_prob) / div):
+                self.mutate_add_connection(config)
+            elif r < ((config.node_add_prob + config.node_delete_prob +
+                       config.conn_add_prob + config.conn_delete_prob) / div):
+                self.mutate_delete_connection()
+        else:
+            if random.random() < config.node_add_prob:
+                self.mutate_add_node(config)
+
+            if random.random() < config.node_delete_prob:
+                self.mutate_delete_node(config)
+
+            if random.random() < config.conn_add_prob:
+                self.mutate_add_connection(config)
+
+            if random.random() < config.conn_delete_prob:
+                self.mutate_delete_connection()
+
     def mutate_add_node(self, config):
         """
         mutate add node when current hidden node (when node number less than the node range).
@@ -351,10 +729,46 @@ class GlobalGenome(DefaultGenome):
         if config.max_node_num - config.num_inputs - config.num_outputs > len(self.nodes):
             super().mutate_add_node(config)
 
+            # the new node is placed in the next row.
+            if self.feature_rows is not None:
+                for node_key in self.nodes:
+                    if node_key not in self.feature_rows:
+                        self.feature_rows[node_key] = len(self.feature_rows)
+
+    def mutate_delete_node(self, config):
+        """
+        mutate delete node, the rows of the following nodes are changed, so the feature matrix is created again.
+
+        :param config: genome config.
+
+        :return: key of the deleted node (-1 if no node is deleted).
+        """
+        del_key = super().mutate_delete_node(config)
+        if del_key != -1:
+            self.feature_rows = None
+
+        return del_key
+
+    def mutate_delete_connection(self):
+        """
+        mutate delete connection, and then clear its weight in the feature matrix.
+        """
+        if self.connections:
+            key = random.choice(list(self.connections.keys()))
+            del self.connections[key]
+
+            if self.feature_rows is not None and self._feature_matrix is not None:
+                in_row, out_row = self.feature_rows.get(key[0]), self.feature_rows.get(key[1])
+                if in_row is not None and out_row is not None:
+                    self.patch_cells([in_row], [out_row + 1], [0])
+
     def __str__(self):
         s = super().__str__()
         s += "\nFeature Matrix:"
-        for row in self.feature_matrix:
+        feature_matrix = self.feature_matrix
+        if sparse.issparse(feature_matrix):
+            feature_matrix = feature_matrix.toarray()
+        for row in feature_matrix:
             s += "\n\t" + str(row)
 
         return s
@@ -0,0 +1,716 @@
+import numpy
+
+from neat.graphs import feed_forward_layers, required_for_output
+from neat.six_util import itervalues
+
+from ReverseEncodingTree.evolution.bean.gene import GeneStore
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + numpy.exp(-numpy.clip(5.0 * z, -60.0, 60.0)))
+
+
+def _tanh(z):
+    return numpy.tanh(numpy.clip(2.5 * z, -60.0, 60.0))
+
+
+def _sin(z):
+    return numpy.sin(numpy.clip(5.0 * z, -60.0, 60.0))
+
+
+def _gauss(z):
+    return numpy.exp(-5.0 * numpy.clip(z, -3.4, 3.4) ** 2)
+
+
+def _relu(z):
+    return numpy.where(z > 0.0, z, 0.0)
+
+
+def _softplus(z):
+    return 0.2 * numpy.log(1 + numpy.exp(numpy.clip(5.0 * z, -60.0, 60.0)))
+
+
+def _identity(z):
+    return z
+
+
+def _clamped(z):
+    return numpy.clip(z, -1.0, 1.0)
+
+
+def _inv(z):
+    with numpy.errstate(divide="ignore"):
+        return numpy.where(z != 0.0, 1.0 / numpy.where(z != 0.0, z, 1.0), 0.0)
+
+
+def _log(z):
+    return numpy.log(numpy.maximum(z, 1e-7))
+
+
+def _exp(z):
+    return numpy.exp(numpy.clip(z, -60.0, 60.0))
+
+
+def _abs(z):
+    return numpy.abs(z)
+
+
+def _hat(z):
+    return numpy.maximum(0.0, 1 - numpy.abs(z))
+
+
+def _square(z):
+    return z ** 2
+
+
+def _cube(z):
+    return z ** 3
+
+
+# array versions of the built-in activation functions in neat.activations.
+activation_functions = {"sigmoid": _sigmoid, "tanh": _tanh, "sin": _sin, "gauss": _gauss, "relu": _relu,
+                        "softplus": _softplus, "identity": _identity, "clamped": _clamped, "inv": _inv, "log": _log,
+                        "exp": _exp, "abs": _abs, "hat": _hat, "square": _square, "cube": _cube}
+
+
+def _maxabs(values, axis):
+    indices = numpy.expand_dims(numpy.argmax(numpy.abs(values), axis=axis), axis)
+    return numpy.squeeze(numpy.take_along_axis(values, indices, axis=axis), axis=axis)
+
+
+# array versions of the built-in aggregation functions in neat.aggregations.
+aggregation_functions = {"sum": numpy.sum, "product": numpy.prod, "max": numpy.max, "min": numpy.min,
+                         "maxabs": _maxabs, "median": numpy.median, "mean": numpy.mean}
+
+
+def obtain_activation(name, genome_config):
+    """
+    obtain the array version of activation function.
+
+    :param name: name of activation function.
+    :param genome_config: genome config, for the user-defined activation functions.
+
+    :return: activation function working on arrays.
+    """
+    if name in activation_functions:
+        return activation_functions[name]
+
+    return numpy.vectorize(genome_config.activation_defs.get(name), otypes=[float])
+
+
+def obtain_aggregation(name, genome_config):
+    """
+    obtain the array version of aggregation function.
+
+    :param name: name of aggregation function.
+    :param genome_config: genome config, for the user-defined aggregation functions.
+
+    :return: aggregation function working on arrays, aggregate along the given axis.
+    """
+    if name in aggregation_functions:
+        return aggregation_functions[name]
+
+    function = genome_config.aggregation_function_defs.get(name)
+
+    def aggregation(values, axis):
+        return numpy.apply_along_axis(lambda value: function(list(value)), axis, values)
+
+    return aggregation
+
+
+class BatchFeedForwardNetwork(object):
+
+    def __init__(self, input_count, output_indices, layers, value_count):
+        """
+        initialize the feed-forward network compiled into dense arrays.
+
+        :param input_count: number of inputs.
+        :param output_indices: column of each output in the value array.
+        :param layers: layers in topological order, see BatchFeedForwardNetwork.create.
+        :param value_count: number of columns in the value array (inputs, evaluated nodes and a zero column).
+        """
+        self.input_count = input_count
+        self.output_indices = output_indices
+        self.layers = layers
+        self.value_count = value_count
+
+    def activate(self, inputs):
+        """
+        activate the network by a batch of inputs.
+
+        :param inputs: inputs with shape (batch, input count).
+
+        :return: outputs with shape (batch, output count).
+        """
+        inputs = numpy.asarray(inputs, dtype=float)
+        if inputs.ndim == 1:
+            inputs = inputs[numpy.newaxis, :]
+        if inputs.shape[1] != self.input_count:
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.input_count, inputs.shape[1]))
+
+        values = numpy.zeros((inputs.shape[0], self.value_count))
+        values[:, :self.input_count] = inputs
+
+        for start, stop, weights, biases, responses, activations, aggregations in self.layers:
+            if aggregations is None:
+                # sum aggregation for the whole layer, obtain by one matrix product.
+                aggregated = numpy.dot(values[:, :start], weights)
+            else:
+                aggregated = numpy.empty((inputs.shape[0], stop - start))
+                for column, (aggregation, links) in enumerate(aggregations):
+                    aggregated[:, column] = aggregation(values[:, links] * weights[links, column], axis=1)
+
+            sums = biases + responses * aggregated
+            for activation, columns in activations:
+                values[:, start + columns] = activation(sums[:, columns])
+
+        return values[:, self.output_indices]
+
+    @staticmethod
+    def create(genome, config):
+        """
+        compile a genome into dense weight arrays in topological order.
+
+        :param genome: genome of NEAT.
+        :param config: configures of NEAT.
+
+        :return: compiled network.
+        """
+        genome_config = config.genome_config
+        connections = [gene for gene in itervalues(genome.connections) if gene.enabled]
+        layers = feed_forward_layers(genome_config.input_keys, genome_config.output_keys,
+                                     [gene.key for gene in connections])
+
+        mapping = {}
+        for index, input_key in enumerate(genome_config.input_keys):
+            mapping[input_key] = index
+
+        compiled_layers = []
+        start = len(genome_config.input_keys)
+        for layer_keys in layers:
+            layer = sorted(layer_keys)
+            stop = start + len(layer)
+            for column, node_key in enumerate(layer):
+                mapping[node_key] = start + column
+
+            weights = numpy.zeros((start, len(layer)))
+            links = [[] for _ in layer]
+            for gene in connections:
+                in_key, out_key = gene.key
+                if out_key in layer_keys:
+                    column = mapping[out_key] - start
+                    weights[mapping[in_key], column] = gene.weight
+                    links[column].append(mapping[in_key])
+
+            nodes = [genome.nodes[node_key] for node_key in layer]
+            biases = numpy.array([node.bias for node in nodes], dtype=float)
+            responses = numpy.array([node.response for node in nodes], dtype=float)
+
+            activations = {}
+            for column, node in enumerate(nodes):
+                activations.setdefault(node.activation, []).append(column)
+            activations = [(obtain_activation(name, genome_config), numpy.array(columns))
+                           for name, columns in activations.items()]
+
+            if all([node.aggregation == "sum" for node in nodes]):
+                aggregations = None
+            else:
+                aggregations = [(obtain_aggregation(node.aggregation, genome_config), numpy.array(link))
+                                for node, link in zip(nodes, links)]
+
+            compiled_layers.append((start, stop, weights, biases, responses, activations, aggregations))
+            start = stop
+
+        # the output nodes not in any layer are always 0.0, like neat.nn.FeedForwardNetwork.
+        output_indices = numpy.array([mapping.get(output_key, start) for output_key in genome_config.output_keys])
+
+        return BatchFeedForwardNetwork(len(genome_config.input_keys), output_indices, compiled_layers, start + 1)
+
+
+def obtain_mapping(genome, input_keys):
+    """
+    obtain the position mapping of nodes, the same as the feature matrix of GlobalGenome (inputs first).
+
+    :param genome: genome of NEAT.
+    :param input_keys: keys of input nodes.
+
+    :return: position mapping from node key to row.
+    """
+    mapping = {}
+    for index, input_key in enumerate(input_keys):
+        mapping[input_key] = index
+
+    index = len(input_keys)
+    for node_key in genome.nodes:
+        mapping[node_key] = index
+        index += 1
+
+    return mapping
+
+
+class PopulationFeedForwardNetwork(object):
+
+    def __init__(self, input_indices, output_indices, weights, biases, responses, activations, evaluated, depth):
+        """
+        initialize the feed-forward networks of the whole population stacked into 3-D arrays.
+
+        :param input_indices: columns of the inputs.
+        :param output_indices: columns of the outputs in each network, shape is (genome, output).
+        :param weights: connection weights, shape is (genome, node, node), from row node to column node.
+        :param biases: node biases, shape is (genome, node).
+        :param responses: node responses, shape is (genome, node).
+        :param activations: activation function and its mask with shape (genome, node).
+        :param evaluated: mask of nodes evaluated by neat.nn.FeedForwardNetwork, shape is (genome, node).
+        :param depth: maximum number of layers in the networks.
+        """
+        self.input_indices = input_indices
+        self.output_indices = output_indices
+        self.weights = weights
+        self.biases = biases[:, numpy.newaxis, :]
+        self.responses = responses[:, numpy.newaxis, :]
+        self.activations = [(activation, mask[:, numpy.newaxis, :]) for activation, mask in activations]
+        self.evaluated = evaluated[:, numpy.newaxis, :]
+        self.depth = depth
+
+    def activate(self, inputs):
+        """
+        activate all the networks by a batch of inputs.
+
+        :param inputs: inputs shared by all the networks with shape (batch, input count),
+                       or inputs of each network with shape (genome, batch, input count).
+
+        :return: outputs with shape (genome, batch, output count).
+        """
+        inputs = numpy.asarray(inputs, dtype=float)
+        genome_count, node_count = self.weights.shape[0], self.weights.shape[1]
+        if inputs.shape[-1] != len(self.input_indices):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(len(self.input_indices), inputs.shape[-1]))
+
+        # the last column is always 0.0, for the outputs which are not in the networks.
+        values = numpy.zeros((genome_count, inputs.shape[-2], node_count + 1))
+        values[:, :, self.input_indices] = inputs
+
+        # each pass fixes one more layer, values are exact after passing the deepest layer.
+        for _ in range(self.depth):
+            sums = self.biases + self.responses * numpy.matmul(values[:, :, :node_count], self.weights)
+            outputs = numpy.zeros(sums.shape)
+            for activation, mask in self.activations:
+                outputs = numpy.where(mask, activation(sums), outputs)
+            values[:, :, :node_count] = numpy.where(self.evaluated, outputs, values[:, :, :node_count])
+
+        return numpy.take_along_axis(values, self.output_indices[:, numpy.newaxis, :], axis=2)
+
+    @staticmethod
+    def create(genomes, config):
+        """
+        stack the genomes into population arrays laid out as the feature matrices of GlobalGenome.
+
+        :param genomes: genomes of NEAT.
+        :param config: configures of NEAT.
+
+        :return: stacked networks.
+        """
+        genome_config = config.genome_config
+        input_keys, output_keys = genome_config.input_keys, genome_config.output_keys
+
+        if hasattr(genome_config, "max_node_num"):
+            node_count = genome_config.max_node_num
+        else:
+            node_count = len(input_keys) + max([len(genome.nodes) for genome in genomes])
+
+        weights = numpy.zeros((len(genomes), node_count, node_count))
+        links = numpy.zeros((len(genomes), node_count, node_count), dtype=bool)
+        blocked = numpy.zeros((len(genomes), node_count), dtype=bool)
+        biases = numpy.zeros((len(genomes), node_count))
+        responses = numpy.zeros((len(genomes), node_count))
+        activation_masks = {}
+        output_indices = numpy.full((len(genomes), len(output_keys)), node_count)
+
+        for index, genome in enumerate(genomes):
+            if isinstance(genome.nodes, GeneStore):
+                # the genes are saved in arrays, so the whole genome is filled at once.
+                rows = numpy.arange(len(input_keys), len(input_keys) + len(genome.nodes))
+                if numpy.any(genome.nodes.obtain_values("aggregation") != "sum"):
+                    raise RuntimeError("Population network only supports the sum aggregation.")
+                biases[index, rows] = genome.nodes.obtain_values("bias")
+                responses[index, rows] = genome.nodes.obtain_values("response")
+                activation_names = genome.nodes.obtain_values("activation")
+                for name in set(activation_names):
+                    if name not in activation_masks:
+                        activation_masks[name] = numpy.zeros((len(genomes), node_count), dtype=bool)
+                    activation_masks[name][index, rows[activation_names == name]] = True
+
+                enabled = genome.connections.obtain_values("enabled")
+                connection_rows = genome.nodes.obtain_rows(genome.connections.obtain_keys(), input_keys)
+                in_rows, out_rows = connection_rows[:, 0], connection_rows[:, 1]
+                linked = enabled & (in_rows >= 0) & (out_rows >= 0)
+                weights[index, in_rows[linked], out_rows[linked]] = genome.connections.obtain_values("weight")[linked]
+                links[index, in_rows[linked], out_rows[linked]] = True
+                # the input node is lost, the output node cannot be evaluated.
+                blocked[index, out_rows[enabled & (in_rows < 0) & (out_rows >= 0)]] = True
+
+                output_rows = genome.nodes.obtain_rows(output_keys, input_keys)
+                output_indices[index, output_rows >= 0] = output_rows[output_rows >= 0]
+                continue
+
+            mapping = obtain_mapping(genome, input_keys)
+
+            for node_key, node_gene in genome.nodes.items():
+                if node_gene.aggregation != "sum":
+                    raise RuntimeError("Population network only supports the sum aggregation.")
+                row = mapping[node_key]
+                biases[index, row] = node_gene.bias
+                responses[index, row] = node_gene.response
+                if node_gene.activation not in activation_masks:
+                    activation_masks[node_gene.activation] = numpy.zeros((len(genomes), node_count), dtype=bool)
+                activation_masks[node_gene.activation][index, row] = True
+
+            for connection_gene in itervalues(genome.connections):
+                if connection_gene.enabled:
+                    in_key, out_key = connection_gene.key
+                    if in_key in mapping and out_key in mapping:
+                        weights[index, mapping[in_key], mapping[out_key]] = connection_gene.weight
+                        links[index, mapping[in_key], mapping[out_key]] = True
+                    elif out_key in mapping:
+                        # the input node is lost, the output node cannot be evaluated.
+                        blocked[index, mapping[out_key]] = True
+
+            for output_index, output_key in enumerate(output_keys):
+                if output_key in mapping:
+                    output_indices[index, output_index] = mapping[output_key]
+
+        # evaluate the nodes whose inputs are all ready, layer by layer, like neat.graphs.feed_forward_layers.
+        ready = numpy.zeros((len(genomes), node_count), dtype=bool)
+        ready[:, :len(input_keys)] = True
+        candidates = numpy.any(links, axis=1) & numpy.logical_not(blocked)
+        depth = 0
+        while True:
+            waiting = numpy.any(links & numpy.logical_not(ready)[:, :, numpy.newaxis], axis=1)
+            new_ready = candidates & numpy.logical_not(waiting) & numpy.logical_not(ready)
+            if not numpy.any(new_ready):
+                break
+            ready |= new_ready
+            depth += 1
+
+        evaluated = ready.copy()
+        evaluated[:, :len(input_keys)] = False
+
+        activations = [(obtain_activation(name, genome_config), mask) for name, mask in activation_masks.items()]
+
+        return PopulationFeedForwardNetwork(numpy.arange(len(input_keys)), output_indices, weights,
+                                            biases, responses, activations, evaluated, depth)
+
+
+class PopulationRecurrentNetwork(object):
+
+    def __init__(self, input_indices, output_indices, weights, biases, responses, activations, evaluated):
+        """
+        initialize the recurrent networks of the whole population stacked into 3-D arrays,
+        the state of all networks and batch elements is kept in one array.
+
+        :param input_indices: columns of the inputs.
+        :param output_indices: columns of the outputs in each network, shape is (genome, output).
+        :param weights: connection weights, shape is (genome, node, node), from row node to column node.
+        :param biases: node biases, shape is (genome, node).
+        :param responses: node responses, shape is (genome, node).
+        :param activations: activation function and its mask with shape (genome, node).
+        :param evaluated: mask of nodes evaluated by neat.nn.RecurrentNetwork, shape is (genome, node).
+        """
+        self.input_indices = input_indices
+        self.output_indices = output_indices
+        self.weights = weights
+        self.biases = biases[:, numpy.newaxis, :]
+        self.responses = responses[:, numpy.newaxis, :]
+        self.activations = [(activation, mask[:, numpy.newaxis, :]) for activation, mask in activations]
+        self.evaluated = evaluated[:, numpy.newaxis, :]
+
+        # values of the previous activation, shape is (genome, batch, node + 1).
+        self.values = None
+
+    def reset(self, mask=None):
+        """
+        reset the state of networks.
+
+        :param mask: batch elements to reset, shape is (batch,) or (genome, batch), None means all of them.
+        """
+        if mask is None or self.values is None:
+            self.values = None
+        else:
+            mask = numpy.broadcast_to(numpy.asarray(mask, dtype=bool), self.values.shape[:2])
+            self.values[mask] = 0.0
+
+    def activate(self, inputs):
+        """
+        activate all the networks by one step of a batch of inputs,
+        all nodes are updated by the values of the previous step.
+
+        :param inputs: inputs shared by all the networks with shape (batch, input count),
+                       or inputs of each network with shape (genome, batch, input count).
+
+        :return: outputs with shape (genome, batch, output count).
+        """
+        inputs = numpy.asarray(inputs, dtype=float)
+        genome_count, node_count = self.weights.shape[0], self.weights.shape[1]
+        if inputs.shape[-1] != len(self.input_indices):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(len(self.input_indices), inputs.shape[-1]))
+
+        # the last column is always 0.0, for the outputs which are not in the networks.
+        if self.values is None or self.values.shape[1] != inputs.shape[-2]:
+            self.values = numpy.zeros((genome_count, inputs.shape[-2], node_count + 1))
+        self.values[:, :, self.input_indices] = inputs
+
+        sums = self.biases + self.responses * numpy.matmul(self.values[:, :, :node_count], self.weights)
+        outputs = numpy.zeros(sums.shape)
+        for activation, mask in self.activations:
+            outputs = numpy.where(mask, activation(sums), outputs)
+
+        values = numpy.zeros(self.values.shape)
+        values[:, :, :node_count] = numpy.where(self.evaluated, outputs, 0.0)
+        values[:, :, self.input_indices] = inputs
+        self.values = values
+
+        return numpy.take_along_axis(values, self.output_indices[:, numpy.newaxis, :], axis=2)
+
+    @staticmethod
+    def create(genomes, config):
+        """
+        stack the genomes into population arrays laid out as the feature matrices of GlobalGenome.
+
+        :param genomes: genomes of NEAT.
+        :param config: configures of NEAT.
+
+        :return: stacked networks.
+        """
+        genome_config = config.genome_config
+        input_keys, output_keys = genome_config.input_keys, genome_config.output_keys
+
+        if hasattr(genome_config, "max_node_num"):
+            node_count = genome_config.max_node_num
+        else:
+            node_count = len(input_keys) + max([len(genome.nodes) for genome in genomes])
+
+        weights = numpy.zeros((len(genomes), node_count, node_count))
+        evaluated = numpy.zeros((len(genomes), node_count), dtype=bool)
+        biases = numpy.zeros((len(genomes), node_count))
+        responses = numpy.zeros((len(genomes), node_count))
+        activation_masks = {}
+        output_indices = numpy.full((len(genomes), len(output_keys)), node_count)
+
+        for index, genome in enumerate(genomes):
+            mapping = obtain_mapping(genome, input_keys)
+            required = required_for_output(input_keys, output_keys, genome.connections)
+
+            for node_key, node_gene in genome.nodes.items():
+                if node_gene.aggregation != "sum":
+                    raise RuntimeError("Population network only supports the sum aggregation.")
+                row = mapping[node_key]
+                biases[index, row] = node_gene.bias
+                responses[index, row] = node_gene.response
+                if node_gene.activation not in activation_masks:
+                    activation_masks[node_gene.activation] = numpy.zeros((len(genomes), node_count), dtype=bool)
+                activation_masks[node_gene.activation][index, row] = True
+
+            for connection_gene in itervalues(genome.connections):
+                in_key, out_key = connection_gene.key
+                if connection_gene.enabled and (in_key in required or out_key in required) and out_key in mapping:
+                    # the node with any expressed input is evaluated, the lost input node is always 0.0.
+                    evaluated[index, mapping[out_key]] = True
+                    if in_key in mapping:
+                        weights[index, mapping[in_key], mapping[out_key]] = connection_gene.weight
+
+            for output_index, output_key in enumerate(output_keys):
+                if output_key in mapping:
+                    output_indices[index, output_index] = mapping[output_key]
+
+        evaluated[:, :len(input_keys)] = False
+
+        activations = [(obtain_activation(name, genome_config), mask) for name, mask in activation_masks.items()]
+
+        return PopulationRecurrentNetwork(numpy.arange(len(input_keys)), output_indices, weights,
+                                          biases, responses, activations, evaluated)
+
+
+def _obtain_scalar_aggregation(name, genome_config):
+    """
+    obtain the aggregation function of the single activation, the builtin sum skips the wrapper of NEAT.
+
+    :param name: name of aggregation function.
+    :param genome_config: genome configures of NEAT.
+
+    :return: aggregation function.
+    """
+    if name == "sum":
+        return sum
+
+    return genome_config.aggregation_function_defs.get(name)
+
+
+class CompactFeedForwardNetwork(object):
+
+    __slots__ = ("input_count", "output_indices", "node_evals", "values")
+
+    def __init__(self, input_count, output_indices, node_evals, value_count):
+        """
+        initialize the feed-forward network compiled into integer-indexed values for the single activation.
+
+        :param input_count: number of inputs.
+        :param output_indices: index of each output in the values.
+        :param node_evals: index, activation, aggregation, bias, response and links of each node in evaluation order.
+        :param value_count: number of values (inputs, evaluated nodes and a zero value).
+        """
+        self.input_count = input_count
+        self.output_indices = output_indices
+        self.node_evals = node_evals
+        self.values = [0.0] * value_count
+
+    def activate(self, inputs):
+        """
+        activate the network by one input.
+
+        :param inputs: input values.
+
+        :return: output values.
+        """
+        if self.input_count != len(inputs):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.input_count, len(inputs)))
+
+        values = self.values
+        values[:self.input_count] = inputs
+        for index, activation, aggregation, bias, response, links in self.node_evals:
+            # the explicit loop keeps the values local, which is faster than a comprehension.
+            node_inputs = []
+            for i, w in links:
+                node_inputs.append(values[i] * w)
+            values[index] = activation(bias + response * aggregation(node_inputs))
+
+        return [values[index] for index in self.output_indices]
+
+    @staticmethod
+    def create(genome, config):
+        """
+        compile a genome into the integer-indexed values, the same evaluation as neat.nn.FeedForwardNetwork.
+
+        :param genome: genome of NEAT.
+        :param config: configures of NEAT.
+
+        :return: compiled network.
+        """
+        genome_config = config.genome_config
+        connections = [gene for gene in itervalues(genome.connections) if gene.enabled]
+        layers = feed_forward_layers(genome_config.input_keys, genome_config.output_keys,
+                                     [gene.key for gene in connections])
+
+        mapping = {}
+        for index, input_key in enumerate(genome_config.input_keys):
+            mapping[input_key] = index
+
+        links = {}
+        for gene in connections:
+            links.setdefault(gene.key[1], []).append((gene.key[0], gene.weight))
+
+        node_evals = []
+        for layer in layers:
+            for node_key in layer:
+                mapping[node_key] = len(mapping)
+                node = genome.nodes[node_key]
+                node_evals.append((mapping[node_key],
+                                   genome_config.activation_defs.get(node.activation),
+                                   _obtain_scalar_aggregation(node.aggregation, genome_config),
+                                   node.bias, node.response,
+                                   tuple([(mapping[in_key], weight) for in_key, weight in links.get(node_key, [])])))
+
+        # the output nodes not in any layer are always 0.0, like neat.nn.FeedForwardNetwork.
+        output_indices = tuple([mapping.get(output_key, len(mapping)) for output_key in genome_config.output_keys])
+
+        return CompactFeedForwardNetwork(len(genome_config.input_keys), output_indices, tuple(node_evals),
+                                         len(mapping) + 1)
+
+
+class CompactRecurrentNetwork(object):
+
+    __slots__ = ("input_count", "output_indices", "node_evals", "values", "active")
+
+    def __init__(self, input_count, output_indices, node_evals, value_count):
+        """
+        initialize the recurrent network compiled into two integer-indexed value buffers.
+
+        :param input_count: number of inputs.
+        :param output_indices: index of each output in the values.
+        :param node_evals: index, activation, aggregation, bias, response and links of each node.
+        :param value_count: number of values.
+        """
+        self.input_count = input_count
+        self.output_indices = output_indices
+        self.node_evals = node_evals
+        self.values = [[0.0] * value_count, [0.0] * value_count]
+        self.active = 0
+
+    def reset(self):
+        """
+        reset the state of network.
+        """
+        self.values = [[0.0] * len(self.values[0]), [0.0] * len(self.values[0])]
+        self.active = 0
+
+    def activate(self, inputs):
+        """
+        activate the network by one input, all nodes are updated by the values of the previous activation.
+
+        :param inputs: input values.
+
+        :return: output values.
+        """
+        if self.input_count != len(inputs):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.input_count, len(inputs)))
+
+        in_values = self.values[self.active]
+        out_values = self.values[1 - self.active]
+        self.active = 1 - self.active
+
+        in_values[:self.input_count] = inputs
+        out_values[:self.input_count] = inputs
+        for index, activation, aggregation, bias, response, links in self.node_evals:
+            node_inputs = []
+            for i, w in links:
+                node_inputs.append(in_values[i] * w)
+            out_values[index] = activation(bias + response * aggregation(node_inputs))
+
+        return [out_values[index] for index in self.output_indices]
+
+    @staticmethod
+    def create(genome, config):
+        """
+        compile a genome into the integer-indexed values, the same evaluation as neat.nn.RecurrentNetwork.
+
+        :param genome: genome of NEAT.
+        :param config: configures of NEAT.
+
+        :return: compiled network.
+        """
+        genome_config = config.genome_config
+        required = required_for_output(genome_config.input_keys, genome_config.output_keys, genome.connections)
+
+        mapping = {}
+        for node_key in genome_config.input_keys + genome_config.output_keys:
+            mapping.setdefault(node_key, len(mapping))
+
+        links = {}
+        for gene in itervalues(genome.connections):
+            in_key, out_key = gene.key
+            if gene.enabled and (in_key in required or out_key in required):
+                links.setdefault(out_key, []).append((in_key, gene.weight))
+                mapping.setdefault(out_key, len(mapping))
+                mapping.setdefault(in_key, len(mapping))
+
+        node_evals = []
+        for node_key, node_links in links.items():
+            node = genome.nodes[node_key]
+            node_evals.append((mapping[node_key],
+                               genome_config.activation_defs.get(node.activation),
+                               _obtain_scalar_aggregation(node.aggregation, genome_config),
+                               node.bias, node.response,
+                               tuple([(mapping[in_key], weight) for in_key, weight in node_links])))
+
+        output_indices = tuple([mapping[output_key] for output_key in genome_config.output_keys])
+
+        return CompactRecurrentNetwork(len(genome_config.input_keys), output_indices, tuple(node_evals), len(mapping))
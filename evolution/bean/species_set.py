@@ -3,6 +3,30 @@ from neat.math_util import mean, stdev
 from neat.species import Species, GenomeDistanceCache
 from six import iteritems, itervalues, iterkeys
 
+from ReverseEncodingTree.evolution.bean.feature_set import FeatureSet
+
+
+class FeatureDistanceCache(object):
+
+    def __init__(self, genomes):
+        """
+        initialize the distance cache by the feature matrices of genomes, all the distances are calculated at once.
+
+        :param genomes: genomes with feature matrix, like GlobalGenome.
+        """
+        self.feature_set = FeatureSet.create(genomes)
+        self.distance_matrix = self.feature_set.distance_matrix()
+        # the queried distances, like GenomeDistanceCache.
+        self.distances = {}
+
+    def __call__(self, genome0, genome1):
+        index_1 = self.feature_set.indices[genome0]
+        index_2 = self.feature_set.indices[genome1]
+        d = float(self.distance_matrix[index_1, index_2])
+        self.distances[index_1, index_2] = d
+        self.distances[index_2, index_1] = d
+        return d
+
 
 class StrongSpeciesSet(DefaultSpeciesSet):
 
@@ -22,7 +46,11 @@ class StrongSpeciesSet(DefaultSpeciesSet):
 
         # Find the best representatives for each existing species.
         unspeciated = set(iterkeys(population))
-        distances = GenomeDistanceCache(config.genome_config)
+        genomes = list(itervalues(population)) + [s.representative for s in itervalues(self.species)]
+        if all(hasattr(g, "feature_matrix") for g in genomes):
+            distances = FeatureDistanceCache(genomes)
+        else:
+            distances = GenomeDistanceCache(config.genome_config)
         new_representatives = {}
         new_members = {}
         for sid, s in iteritems(self.species):
@@ -1,10 +1,21 @@
 import random
+from collections import OrderedDict
+from configparser import ConfigParser
 from enum import Enum
-import math
+import hashlib
+import heapq
 import numpy
+from scipy import sparse
 import logging
+import multiprocessing
+import weakref
 
-from neat.nn import feed_forward, recurrent
+from neat.config import ConfigParameter, DefaultClassConfig
+
+from ReverseEncodingTree.evolution.bean.dataset import Dataset, BatchType
+from ReverseEncodingTree.evolution.bean.network import BatchFeedForwardNetwork, PopulationFeedForwardNetwork
+from ReverseEncodingTree.evolution.bean.network import PopulationRecurrentNetwork
+from ReverseEncodingTree.evolution.bean.network import CompactFeedForwardNetwork, CompactRecurrentNetwork
 
 
 class LearnType(Enum):
@@ -28,22 +39,181 @@ class TypeCorrect(Enum):
     Value = 2
 
 
+class InferenceType(Enum):
+    Single = 1
+    Batch = 2
+    Population = 3
+
+
+class CacheType(Enum):
+    Genes = 1
+    FeatureMatrix = 2
+
+
+class FitCache(object):
+
+    def __init__(self, capacity=10000, cache_type=CacheType.Genes, precision=None):
+        """
+        Initialize the fitness cache addressed by the content of genome.
+
+        :param capacity: maximum number of saved fitness, the least recently used one is evicted.
+        :param cache_type: content of the address, CacheType.Genes or CacheType.FeatureMatrix (GlobalGenome).
+        :param precision: decimal places of the quantization (None means exact values).
+        """
+        self.capacity = capacity
+        self.cache_type = cache_type
+        self.precision = precision
+
+        self.records = OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def _quantize(self, values):
+        """
+        Quantize the values by the precision.
+
+        :param values: float values.
+
+        :return: quantized values.
+        """
+        values = numpy.asarray(values, dtype=float)
+        if self.precision is not None:
+            # adding 0.0 removes the negative zeros of rounding.
+            values = numpy.round(values, self.precision) + 0.0
+        return values
+
+    def obtain_key(self, genome, context=None):
+        """
+        Obtain the content address of genome.
+
+        :param genome: genome of NEAT.
+        :param context: evaluation context of the fitness, like the fidelity (or None).
+
+        :return: key of genome in the cache.
+        """
+        if self.cache_type == CacheType.FeatureMatrix and sparse.issparse(genome.feature_matrix):
+            # the sparse feature matrix is addressed by its nonzero positions and values.
+            matrix = genome.feature_matrix.tocoo()
+            values = self._quantize(matrix.data)
+            order = numpy.lexsort((matrix.col, matrix.row))
+            order = order[values[order] != 0]
+            positions = numpy.stack([matrix.row[order], matrix.col[order]]).astype(numpy.int64)
+            content = repr(matrix.shape).encode() + positions.tobytes() + values[order].tobytes()
+        elif self.cache_type == CacheType.FeatureMatrix:
+            content = self._quantize(genome.feature_matrix).tobytes()
+        else:
+            node_keys = sorted(genome.nodes.keys())
+            connection_keys = sorted([key for key, gene in genome.connections.items() if gene.enabled])
+            values = self._quantize([genome.nodes[key].bias for key in node_keys] +
+                                    [genome.nodes[key].response for key in node_keys] +
+                                    [genome.connections[key].weight for key in connection_keys])
+            functions = [(genome.nodes[key].activation, genome.nodes[key].aggregation) for key in node_keys]
+            content = repr((node_keys, connection_keys, functions)).encode() + values.tobytes()
+
+        if context is not None:
+            content = repr(context).encode() + content
+
+        return hashlib.sha1(content).digest()
+
+    def get(self, key):
+        """
+        Get the saved fitness.
+
+        :param key: key of genome in the cache.
+
+        :return: saved fitness (or None).
+        """
+        fitness = self.records.get(key)
+        if fitness is None:
+            self.miss_count += 1
+        else:
+            self.hit_count += 1
+            self.records.move_to_end(key)
+
+        return fitness
+
+    def set(self, key, fitness):
+        """
+        Save the fitness.
+
+        :param key: key of genome in the cache.
+        :param fitness: fitness of genome.
+        """
+        self.records[key] = fitness
+        self.records.move_to_end(key)
+        while len(self.records) > self.capacity:
+            self.records.popitem(last=False)
+
+    def clear(self):
+        """
+        Clear the saved fitness and the counters.
+        """
+        self.records = OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+
+
+# copy of the fitter in the current worker process, see FitDevice.set_parallel.
+_worker_fitter = None
+
+
+def _initialize_worker(fitter, environment_creator):
+    """
+    Initialize the fitter of the worker process, the environment is created once and kept across generations.
+
+    :param fitter: fitter pickled from the main process.
+    :param environment_creator: creator of the environment in Reinforcement Learning (or None).
+    """
+    global _worker_fitter
+    _worker_fitter = fitter
+    if environment_creator is not None:
+        _worker_fitter.environment = environment_creator()
+
+
+def _genome_in_worker(task):
+    """
+    Calculate the evolution process of genome in the worker process.
+
+    :param task: genome, configure, random seed, racing cutoff and context of this evaluation.
+
+    :return: fitness of genome and its racing record.
+    """
+    genome, config, seed, cutoff, context = task
+    _worker_fitter.set_context(context)
+    _worker_fitter.set_random_state(seed)
+    _worker_fitter.race_cutoff = cutoff
+    _worker_fitter.genome_fitness(genome, config)
+    return genome.fitness, _worker_fitter.race_record
+
+
 class FitDevice(object):
 
-    def __init__(self, method, network_type=NetType.FeedForward):
+    def __init__(self, method, network_type=NetType.FeedForward, inference_type=InferenceType.Single):
         """
         Initialize the evolution calculation and type of network.
 
         :param method: evolution process, see /evolution/methods/
         :param network_type: type of network created by genome.
+        :param inference_type: type of inference, InferenceType.Single activates the network once per input,
+                               InferenceType.Batch activates the compiled network once for the whole dataset,
+                               InferenceType.Population activates the networks of all genomes at once,
+                               the recurrent networks keep their states in arrays
+                               (Reinforcement Learning requires a vectorized environment,
+                               see evolution/bean/environment.py).
+                               In Reinforcement Learning, each episode starts from the initial state
+                               of recurrent networks in all the inference types.
         """
         logging.info("Initialize the evolution process calculation.")
         self.method = method
         self.network_type = network_type
+        self.inference_type = inference_type
 
         self.learn_type = None
 
         self.dataset = None
+        self.dataset_inputs = None
+        self.dataset_outputs = None
+        self.batch_index = None
 
         self.environment = None
         self.episode_steps = None
@@ -53,13 +223,69 @@ class FitDevice(object):
         self.attacker = None
         self.noise_level = None
 
+        self.seed = None
+        self.generation = 0
+
+        self.cache = None
+
+        self.race_count = None
+        self.race_cutoff = None
+        self.race_record = (0, 0)
+        self.saved_episodes = 0
+        self.saved_steps = 0
+
+        self.fidelity_generation = None
+        self.start_episode_rate = None
+        self.start_step_rate = None
+        self.promotion_count = None
+        self.promoted_genomes = weakref.WeakSet()
+        self.run_generation = 0
+
+        self.process_count = None
+        self.environment_creator = None
+        self.pool = None
+
+        # compiled networks of genomes, see generated_network.
+        self.networks = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def parse_config(cls, param_dict):
+        """
+        add the fidelity schedule in config.
+
+        :param param_dict: parameter dictionary.
+
+        :return: config.
+        """
+        return DefaultClassConfig(param_dict,
+                                  [ConfigParameter('fidelity_generation', int, 0),
+                                   ConfigParameter('start_episode_rate', float, 0.2),
+                                   ConfigParameter('start_step_rate', float, 0.2),
+                                   ConfigParameter('promotion_count', int, 1)])
+
+    def __getstate__(self):
+        """
+        Obtain the picklable state of the fitter, the process pool is never transferred to the workers.
+
+        :return: state of fitter.
+        """
+        state = self.__dict__.copy()
+        state["pool"] = None
+        state["cache"] = None
+        state["promoted_genomes"] = None
+        state["networks"] = weakref.WeakKeyDictionary()
+        if self.environment_creator is not None:
+            state["environment"] = None
+        return state
+
     def set_environment(self, environment, episode_steps, episode_generation,
                         input_type, output_type,
                         attacker=None, noise_level=None):
         """
         Set the environment of Reinforcement Learning in gym library.
 
-        :param environment: environment of Reinforcement Learning in gym library.
+        :param environment: environment of Reinforcement Learning in gym library
+                            (or vectorized environment in InferenceType.Population).
         :param episode_steps: maximum episode steps.
         :param episode_generation: evaluate by the minimum of episode rewards.
         :param input_type: type of input, TYPE_CORRECT.List or TYPE_CORRECT.Value.
@@ -86,16 +312,209 @@ class FitDevice(object):
         """
         Set the dataset of Supervised Learning.
 
-        :param dataset: dataset, including inputs and expected outputs, type is {"i": data, "o": data}.
+        :param dataset: dataset, including inputs and expected outputs, type is {"i": data, "o": data},
+                        or Dataset for the memory-mapped or streamed mini-batches (see evolution/bean/dataset.py).
         """
         if self.environment is None:
+            if not isinstance(dataset, Dataset):
+                dataset = Dataset(inputs=numpy.array(dataset.get("i"), dtype=float),
+                                  outputs=numpy.array(dataset.get("o"), dtype=float))
             self.dataset = dataset
             self.learn_type = LearnType.Supervised
+            self.set_context(dataset.obtain_index(self.generation))
         elif self.learn_type is None:
             logging.warning("Do not enter data repeatedly!")
         else:
             logging.warning("You have environment in Reinforcement Learning!")
 
+    def set_seed(self, seed):
+        """
+        Set the random seed, every genome is evaluated under a seed derived from it, its generation and its key.
+
+        :param seed: random seed (None means no seeding).
+        """
+        self.seed = seed
+
+    def set_cache(self, capacity=10000, cache_type=CacheType.Genes, precision=None):
+        """
+        Set the fitness cache, the genomes with the same content are never evaluated again.
+
+        :param capacity: maximum number of saved fitness (None means no cache).
+        :param cache_type: content of the address, CacheType.Genes or CacheType.FeatureMatrix (GlobalGenome).
+        :param precision: decimal places of the quantization (None means exact values).
+        """
+        if capacity is None:
+            self.cache = None
+        else:
+            self.cache = FitCache(capacity=capacity, cache_type=cache_type, precision=precision)
+
+    def set_racing(self, elite_count):
+        """
+        Set the racing evaluation in Reinforcement Learning,
+        the remaining episodes of genome are skipped once its minimum episode reward can no longer beat
+        the elite of the current generation. It is not used in InferenceType.Population.
+
+        :param elite_count: number of elites in each generation (None means no racing).
+        """
+        self.race_count = elite_count
+        self.race_cutoff = None
+        self.saved_episodes = 0
+        self.saved_steps = 0
+
+    def set_fidelity(self, fidelity_generation, start_episode_rate=0.2, start_step_rate=0.2, promotion_count=1):
+        """
+        Set the fidelity schedule in Reinforcement Learning,
+        the genomes are evaluated by few and short episodes at first, the episode generation and episode steps
+        grow linearly to the full ones (see set_environment) in the fidelity generation.
+        The best genomes of each generation are re-evaluated at the full fidelity,
+        until the best one is evaluated at the full fidelity before it is compared with the fitness threshold.
+
+        :param fidelity_generation: generations to reach the full fidelity (None or 0 means no schedule).
+        :param start_episode_rate: rate of the episode generation in the first generation.
+        :param start_step_rate: rate of the episode steps in the first generation.
+        :param promotion_count: number of the best genomes re-evaluated at the full fidelity in each generation.
+        """
+        if fidelity_generation is not None and fidelity_generation > 0:
+            self.fidelity_generation = fidelity_generation
+            self.start_episode_rate = start_episode_rate
+            self.start_step_rate = start_step_rate
+            self.promotion_count = max(1, promotion_count)
+        else:
+            self.fidelity_generation = None
+            self.start_episode_rate = None
+            self.start_step_rate = None
+            self.promotion_count = None
+
+        self.reset()
+
+    def set_fidelity_by_file(self, filename):
+        """
+        Set the fidelity schedule by the [FitDevice] section of the task configure.
+
+        :param filename: path of the task configure, see configures/task/.
+        """
+        parameters = ConfigParser()
+        with open(filename) as file:
+            parameters.read_file(file)
+
+        if not parameters.has_section("FitDevice"):
+            self.set_fidelity(None)
+            return
+
+        fidelity_config = self.parse_config(dict(parameters.items("FitDevice")))
+        self.set_fidelity(fidelity_config.fidelity_generation,
+                          fidelity_config.start_episode_rate, fidelity_config.start_step_rate,
+                          fidelity_config.promotion_count)
+
+    def set_parallel(self, process_count, environment_creator=None):
+        """
+        Set the parallel evaluation of genomes in a process pool.
+
+        :param process_count: number of worker processes, None or 1 means serial evaluation.
+        :param environment_creator: picklable creator of the environment in Reinforcement Learning,
+                                    each worker creates its environment once by it.
+                                    If None, the current environment is pickled into the workers.
+        """
+        self.close()
+        if process_count is not None and process_count > 1:
+            logging.info("Evaluate genomes by " + str(process_count) + " processes.")
+            self.process_count = process_count
+            self.environment_creator = environment_creator
+        else:
+            self.process_count = None
+            self.environment_creator = None
+
+    def set_random_state(self, seed):
+        """
+        Set the random state of the evaluation.
+
+        :param seed: random seed of the current evaluation (or None).
+        """
+        if seed is not None:
+            random.seed(seed)
+            numpy.random.seed(seed)
+            if self.environment is not None and hasattr(self.environment, "seed"):
+                self.environment.seed(seed)
+            if self.attacker is not None and hasattr(self.attacker, "seed"):
+                self.attacker.seed(seed)
+
+    def obtain_seed(self, genome=None):
+        """
+        Obtain the random seed of genome (or the whole population) in the current generation.
+
+        :param genome: genome of NEAT, None means the whole population.
+
+        :return: random seed (or None).
+        """
+        if self.seed is None:
+            return None
+
+        # hash of None depends on its address, it is not used in the seed.
+        if genome is None:
+            return hash((self.seed, self.generation)) % (2 ** 32)
+
+        return hash((self.seed, self.generation, genome.key)) % (2 ** 32)
+
+    def obtain_context(self):
+        """
+        Obtain the context of the current evaluation, the fitness is comparable only in the same context.
+
+        :return: index of batch in Supervised Learning,
+                 or episode generation and episode steps in Reinforcement Learning.
+        """
+        if self.learn_type == LearnType.Supervised:
+            return self.batch_index
+
+        return self.episode_generation, self.episode_steps
+
+    def set_context(self, context):
+        """
+        Set the context of the current evaluation.
+
+        :param context: index of batch in Supervised Learning,
+                        or episode generation and episode steps in Reinforcement Learning.
+        """
+        if self.learn_type == LearnType.Supervised:
+            if self.dataset_inputs is None or context != self.batch_index:
+                self.dataset_inputs, self.dataset_outputs = self.dataset.obtain_batch(context)
+                self.batch_index = context
+        else:
+            self.episode_generation, self.episode_steps = context
+
+    def obtain_fidelity(self):
+        """
+        Obtain the fidelity of the current generation in the fidelity schedule.
+
+        :return: episode generation and episode steps.
+        """
+        if self.fidelity_generation is None:
+            return self.episode_generation, self.episode_steps
+
+        rate = min(1.0, self.run_generation / float(self.fidelity_generation))
+        fidelity = []
+        for full_value, start_rate in [(self.episode_generation, self.start_episode_rate),
+                                       (self.episode_steps, self.start_step_rate)]:
+            start_value = min(full_value, max(1, int(round(full_value * start_rate))))
+            fidelity.append(int(round(start_value + (full_value - start_value) * rate)))
+
+        return tuple(fidelity)
+
+    def reset(self):
+        """
+        Reset the fidelity schedule for a new evolution.
+        """
+        self.promoted_genomes = weakref.WeakSet()
+        self.run_generation = 0
+
+    def close(self):
+        """
+        Close the process pool of parallel evaluation.
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
     def genomes_fitness(self, genomes, config):
         """
         Calculate the evolution process of genomes.
@@ -103,9 +522,191 @@ class FitDevice(object):
         :param genomes: genomes of NEAT.
         :param config: configure of genome.
         """
-        for genome_id, genome in genomes:
-            if genome.fitness is None:
+        genomes = [genome for genome_id, genome in genomes]
+
+        if self.learn_type == LearnType.Supervised:
+            self.set_context(self.dataset.obtain_index(self.generation))
+            # the fitness of the previous batch is not comparable, all genomes are evaluated in the current batch.
+            if self.dataset.batch_type == BatchType.Rotating:
+                for genome in genomes:
+                    genome.fitness = None
+
+        # fitness of the best evaluated genomes, the smallest one is the racing cutoff.
+        elites = []
+        if self.race_count is not None and self.learn_type == LearnType.Reinforced:
+            for genome in genomes:
+                if genome.fitness is not None:
+                    self._update_elites(elites, genome.fitness)
+
+        if self.fidelity_generation is not None and self.learn_type == LearnType.Reinforced:
+            full_fidelity = (self.episode_generation, self.episode_steps)
+            fidelity = self.obtain_fidelity()
+            new_genomes = [genome for genome in genomes if genome.fitness is None]
+
+            self.set_context(fidelity)
+            try:
+                self._evaluate_genomes(genomes, config, elites)
+            finally:
+                self.set_context(full_fidelity)
+
+            if fidelity == full_fidelity:
+                self.promoted_genomes.update(new_genomes)
+            self._promote_genomes(genomes, config)
+            logging.info("Fidelity: " + str(fidelity[0]) + " episodes of " + str(fidelity[1]) + " steps.")
+        else:
+            self._evaluate_genomes(genomes, config, elites)
+
+        if self.cache is not None:
+            logging.info("Fitness cache: " + str(self.cache.hit_count) + " hits, "
+                         + str(self.cache.miss_count) + " misses.")
+        if self.race_count is not None:
+            logging.info("Racing: " + str(self.saved_episodes) + " episodes (at most "
+                         + str(self.saved_steps) + " steps) are saved.")
+
+        self.generation += 1
+        self.run_generation += 1
+
+    def _evaluate_genomes(self, genomes, config, elites):
+        """
+        Calculate the fitness of genomes without fitness by the current fidelity.
+
+        :param genomes: genomes in current generation.
+        :param config: configure of genome.
+        :param elites: min-heap of the best fitness (None means no racing).
+        """
+        genomes = [genome for genome in genomes if genome.fitness is None]
+
+        in_population = self.inference_type == InferenceType.Population
+
+        if self.process_count is None and not in_population:
+            for genome in genomes:
+                self.set_random_state(self.obtain_seed(genome))
+                self.race_cutoff = self._obtain_cutoff(elites)
                 self.genome_fitness(genome, config)
+                self._update_elites(elites, genome.fitness)
+                self.saved_episodes += self.race_record[0]
+                self.saved_steps += self.race_record[1]
+        else:
+            # the genomes with the same content are evaluated once.
+            groups = self._restore_fitness(genomes)
+            genomes = [group[0] for group in groups.values()]
+            stopped_keys = set()
+
+            if in_population:
+                if len(genomes) > 0:
+                    self.set_random_state(self.obtain_seed())
+                    if self.learn_type == LearnType.Supervised:
+                        self._population_in_supervised(genomes, config)
+                    else:
+                        self._population_in_reinforced(genomes, config)
+            else:
+                if self.pool is None:
+                    self.pool = multiprocessing.Pool(processes=self.process_count, initializer=_initialize_worker,
+                                                     initargs=(self, self.environment_creator))
+
+                cutoff = self._obtain_cutoff(elites)
+                context = self.obtain_context()
+                tasks = [(genome, config, self.obtain_seed(genome), cutoff, context) for genome in genomes]
+                chunk_size = max(1, len(tasks) // (self.process_count * 4))
+                results = self.pool.map(_genome_in_worker, tasks, chunk_size)
+                for key, genome, (fitness, race_record) in zip(list(groups.keys()), genomes, results):
+                    genome.fitness = fitness
+                    if race_record[0] > 0:
+                        stopped_keys.add(key)
+                        self.saved_episodes += race_record[0]
+                        self.saved_steps += race_record[1]
+
+            self._save_fitness(groups, stopped_keys)
+
+    def _promote_genomes(self, genomes, config):
+        """
+        Re-evaluate the best genomes at the full fidelity,
+        until the best genome of current generation is evaluated at the full fidelity.
+
+        :param genomes: evaluated genomes in current generation.
+        :param config: configure of genome.
+        """
+        promotion_count = self.promotion_count
+        while True:
+            candidates = [genome for genome in genomes if genome not in self.promoted_genomes]
+            candidates = sorted(candidates, key=lambda genome: genome.fitness, reverse=True)[:promotion_count]
+            if len(candidates) == 0:
+                break
+
+            for genome in candidates:
+                genome.fitness = None
+            # the racing cutoff is obtained at the low fidelity, do not stop the promoted genomes.
+            self._evaluate_genomes(candidates, config, None)
+            self.promoted_genomes.update(candidates)
+
+            if max(genomes, key=lambda genome: genome.fitness) in self.promoted_genomes:
+                break
+            promotion_count = 1
+
+    def _update_elites(self, elites, fitness):
+        """
+        Update the fitness of the best evaluated genomes.
+
+        :param elites: min-heap of the best fitness (None means no racing).
+        :param fitness: fitness of the new evaluated genome.
+        """
+        if self.race_count is not None and elites is not None and fitness is not None:
+            if len(elites) < self.race_count:
+                heapq.heappush(elites, fitness)
+            elif fitness > elites[0]:
+                heapq.heapreplace(elites, fitness)
+
+    def _obtain_cutoff(self, elites):
+        """
+        Obtain the racing cutoff by the best evaluated genomes.
+
+        :param elites: min-heap of the best fitness (None means no racing).
+
+        :return: racing cutoff (or None).
+        """
+        if self.race_count is not None and elites is not None and len(elites) >= self.race_count:
+            return elites[0]
+
+        return None
+
+    def _restore_fitness(self, genomes):
+        """
+        Restore the fitness of genomes from the cache, and group the remaining genomes by content.
+
+        :param genomes: genomes without fitness in current generation.
+
+        :return: groups of the remaining genomes, only the first genome of each group needs evaluation.
+        """
+        groups = OrderedDict()
+        for index, genome in enumerate(genomes):
+            if self.cache is None:
+                groups[index] = [genome]
+            else:
+                key = self.cache.obtain_key(genome, self.obtain_context())
+                if key in groups:
+                    self.cache.hit_count += 1
+                    groups[key].append(genome)
+                else:
+                    fitness = self.cache.get(key)
+                    if fitness is None:
+                        groups[key] = [genome]
+                    else:
+                        genome.fitness = fitness
+
+        return groups
+
+    def _save_fitness(self, groups, stopped_keys):
+        """
+        Save the fitness of the evaluated genomes in the cache, and share it in each group.
+
+        :param groups: groups of the evaluated genomes.
+        :param stopped_keys: keys of the groups stopped by racing, their fitness is not exact and not saved.
+        """
+        for key, group in groups.items():
+            if self.cache is not None and key not in stopped_keys:
+                self.cache.set(key, group[0].fitness)
+            for genome in group[1:]:
+                genome.fitness = group[0].fitness
 
     def genome_fitness(self, genome, config):
         """
@@ -114,11 +715,25 @@ class FitDevice(object):
         :param genome: genome of NEAT.
         :param config: configure of genome.
         """
+        self.race_record = (0, 0)
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.obtain_key(genome, self.obtain_context())
+            fitness = self.cache.get(key)
+            if fitness is not None:
+                genome.fitness = fitness
+                return
+
         if self.learn_type == LearnType.Supervised:
             eval("self._genome_in_supervised")(genome, config)
         else:
             eval("self._genome_in_reinforced")(genome, config)
 
+        # the fitness of stopped genome is not exact, do not save it.
+        if key is not None and self.race_record[0] == 0:
+            self.cache.set(key, genome.fitness)
+
     def _genome_in_supervised(self, genome, config):
         """
         Calculate evolution of genome in Supervised Learning.
@@ -126,16 +741,42 @@ class FitDevice(object):
         :param genome: one genome in current generation.
         :param config: generated configure of network by genome.
         """
-        network = self.generated_network(genome, config)
+        if self.inference_type == InferenceType.Batch and self.network_type == NetType.FeedForward:
+            network = BatchFeedForwardNetwork.create(genome, config)
+            obtain_outputs = network.activate(self.dataset_inputs)
+        else:
+            network = self.generated_network(genome, config)
 
-        obtain_outputs = []
-        for current_input in self.dataset.get("i"):
-            obtain_outputs.append(network.activate(current_input))
+            obtain_outputs = []
+            for current_input in self.dataset_inputs:
+                obtain_outputs.append(network.activate(current_input))
 
         genome.fitness = self.method.calculate(learn_type=self.learn_type,
                                                obtain_outputs=obtain_outputs,
-                                               expected_outputs=self.dataset.get("o"))
+                                               expected_outputs=self.dataset_outputs)
     
+    def _population_in_supervised(self, genomes, config):
+        """
+        Calculate evolution of all genomes in Supervised Learning by one activation of the stacked networks.
+
+        :param genomes: genomes without fitness in current generation.
+        :param config: generated configure of network by genome.
+        """
+        network = self.generated_population_network(genomes, config)
+        if self.network_type == NetType.Recurrent:
+            # the rows are the steps of recurrent networks, like the activation one by one.
+            obtain_outputs = numpy.concatenate([network.activate(current_input[numpy.newaxis, :])
+                                                for current_input in self.dataset_inputs], axis=1)
+        else:
+            obtain_outputs = network.activate(self.dataset_inputs)
+
+        fitnesses = self.method.calculate(learn_type=self.learn_type,
+                                          obtain_outputs=obtain_outputs,
+                                          expected_outputs=self.dataset_outputs)
+
+        for genome, fitness in zip(genomes, fitnesses):
+            genome.fitness = fitness
+
     def _genome_in_reinforced(self, genome, config):
         """
         Calculate evolution of genome in Reinforcement Learning.
@@ -146,19 +787,36 @@ class FitDevice(object):
         network = self.generated_network(genome, config)
 
         has_attack = self.attacker is not None and self.noise_level is not None
+        # the attacked steps of each episode are decided in advance by the batched attacker.
+        batch_attack = has_attack and hasattr(self.attacker, "attack_batch")
 
         episode_recorder = []
         # tasks many episodes for the genome in case it is lucky.
         for episode in range(self.episode_generation):
+            if self.network_type == NetType.Recurrent:
+                network.reset()
+
             accumulative_recorder = 0
             attack_count = 0
             observation = self.environment.reset()
+            if batch_attack:
+                attack_mask = self.attacker.obtain_mask(self.episode_steps, self.noise_level)
+                self.attacker.prepare_noise(self.episode_steps, numpy.shape(numpy.reshape(observation, (1, -1))))
             for step in range(self.episode_steps):
                 # set attack if has attack.
-                if has_attack and random.randint(0, 100) < self.noise_level * 100:
-                    if type(observation) is not numpy.ndarray:
-                        observation = numpy.array([observation])
-                    actual_observation = self.attacker.attack(observation)
+                if batch_attack:
+                    need_attack = attack_mask[step]
+                else:
+                    need_attack = has_attack and random.randint(0, 100) < self.noise_level * 100
+
+                if need_attack:
+                    if batch_attack:
+                        actual_observation = self.attacker.attack_batch(numpy.reshape(observation, (1, -1)),
+                                                                        step=step)[0]
+                    else:
+                        if type(observation) is not numpy.ndarray:
+                            observation = numpy.array([observation])
+                        actual_observation = self.attacker.attack(observation)
                     attack_count += 1
                 else:
                     actual_observation = observation
@@ -189,25 +847,107 @@ class FitDevice(object):
                     observation = current_observation
             episode_recorder.append(accumulative_recorder)
 
+            # racing: the minimum can only decrease, stop when it can no longer beat the cutoff.
+            if self.race_cutoff is not None and episode + 1 < self.episode_generation \
+                    and numpy.min(episode_recorder) / float(self.episode_steps) <= self.race_cutoff:
+                skipped_episodes = self.episode_generation - episode - 1
+                self.race_record = (skipped_episodes, skipped_episodes * self.episode_steps)
+                break
+
         genome.fitness = self.method.calculate(learn_type=self.learn_type,
                                                episode_recorder=episode_recorder,
                                                episode_steps=self.episode_steps)
     
+    def _population_in_reinforced(self, genomes, config):
+        """
+        Calculate evolution of all genomes in Reinforcement Learning,
+        all episodes of all genomes are rolled out in lockstep by the vectorized environment.
+
+        :param genomes: genomes without fitness in current generation.
+        :param config: generated configure of network by genome.
+        """
+        network = self.generated_population_network(genomes, config)
+
+        has_attack = self.attacker is not None and self.noise_level is not None
+        batch_attack = has_attack and hasattr(self.attacker, "attack_batch")
+
+        environment_count = len(genomes) * self.episode_generation
+        observations = self.environment.reset(environment_count)
+        if batch_attack:
+            attack_masks = self.attacker.obtain_mask((self.episode_steps, environment_count), self.noise_level)
+            self.attacker.prepare_noise(self.episode_steps, observations.shape)
+        accumulative_recorder = numpy.zeros(environment_count)
+        # done episodes are masked, the batch keeps running until all of them are done.
+        running = numpy.ones(environment_count, dtype=bool)
+        for step in range(self.episode_steps):
+            # set attack if has attack.
+            if batch_attack:
+                observations = self.attacker.attack_batch(observations, attack_masks[step], step)
+            elif has_attack:
+                attack_indices = numpy.where(numpy.random.randint(0, 101, environment_count) < self.noise_level * 100)
+                for index in attack_indices[0]:
+                    observations[index] = self.attacker.attack(observations[index])
+
+            action_values = network.activate(observations.reshape(len(genomes), self.episode_generation, -1))
+            actions = numpy.argmax(action_values, axis=2).reshape(environment_count)
+
+            observations, rewards, dones, _ = self.environment.step(actions)
+            accumulative_recorder += numpy.where(running, rewards, 0)
+            running &= numpy.logical_not(dones)
+
+            if not numpy.any(running):
+                break
+
+        for genome, episode_recorder in zip(genomes, accumulative_recorder.reshape(len(genomes), -1)):
+            genome.fitness = self.method.calculate(learn_type=self.learn_type,
+                                                   episode_recorder=episode_recorder,
+                                                   episode_steps=self.episode_steps)
+
+    def generated_population_network(self, genomes, config):
+        """
+        Obtain the stacked networks of genomes and their configure.
+
+        :param genomes: genomes in current generation.
+        :param config: generated configures of network by genome.
+
+        :return: generated stacked networks.
+        """
+        if self.network_type == NetType.FeedForward:
+            return PopulationFeedForwardNetwork.create(genomes, config)
+        elif self.network_type == NetType.Recurrent:
+            return PopulationRecurrentNetwork.create(genomes, config)
+
+        return None
+
     def generated_network(self, genome, config):
         """
-        Obtain a network from genome and its configure.
+        Obtain a network from genome and its configure,
+        the compiled network is kept until the genome mutates (see the revision of GlobalGenome),
+        the genomes without revision are not expected to change after their evaluation, like NEAT reproduction.
 
         :param genome: all genomes in current generation.
         :param config: generated configures of network by genome.
 
         :return: generated network.
         """
+        revision = getattr(genome, "revision", None)
+        record = self.networks.get(genome)
+        if record is not None and record[0] == revision and record[1] is config \
+                and record[2] == self.network_type:
+            network = record[3]
+            if self.network_type == NetType.Recurrent:
+                network.reset()
+            return network
+
         if self.network_type == NetType.FeedForward:
-            return feed_forward.FeedForwardNetwork.create(genome, config)
+            network = CompactFeedForwardNetwork.create(genome, config)
         elif self.network_type == NetType.Recurrent:
-            return recurrent.RecurrentNetwork.create(genome, config)
+            network = CompactRecurrentNetwork.create(genome, config)
+        else:
+            return None
 
-        return None
+        self.networks[genome] = (revision, config, self.network_type, network)
+        return network
 
 
 class FitProcess(object):
@@ -222,26 +962,26 @@ class FitProcess(object):
         self.init_fitness = init_fitness
         self.eval_type = eval_type
 
-    def _update(self, previous_fitness, output, expected_output):
+    def _difference(self, obtain_outputs, expected_outputs):
         """
-        Update the current fitness.
+        Calculate the total difference between the actual outputs and the expected outputs.
 
-        :param previous_fitness: previous fitness.
-        :param output: actual outputs in Supervised Learning.
-        :param expected_output: expected outputs in Supervised Learning.
+        :param obtain_outputs: actual outputs in Supervised Learning, shape is (..., sample, output).
+        :param expected_outputs: expected outputs in Supervised Learning, shape is (sample, output).
 
-        :return: current fitness.
+        :return: total difference of each leading index.
         """
-        record = 0
-        for value, expected_value in zip(output, expected_output):
-            if self.eval_type == EvalType.EulerDistance:
-                record += math.sqrt(math.pow(value - expected_value, 2))
-            elif self.eval_type == EvalType.HammingDistance:
-                record += abs(1 - int(value == expected_value))
-            elif self.eval_type == EvalType.ManhattanDistance:
-                record += math.pow(value - expected_value, 2)
+        obtain_outputs = numpy.asarray(obtain_outputs, dtype=float)
+        expected_outputs = numpy.asarray(expected_outputs, dtype=float)
+
+        if self.eval_type == EvalType.EulerDistance:
+            record = numpy.sqrt(numpy.square(obtain_outputs - expected_outputs))
+        elif self.eval_type == EvalType.HammingDistance:
+            record = numpy.not_equal(obtain_outputs, expected_outputs)
+        else:
+            record = numpy.square(obtain_outputs - expected_outputs)
 
-        return previous_fitness - record
+        return numpy.sum(record, axis=(-2, -1))
 
     def calculate(self, learn_type,
                   obtain_outputs=None, expected_outputs=None,
@@ -260,9 +1000,6 @@ class FitProcess(object):
         if learn_type == LearnType.Supervised:
             if self.init_fitness is None:
                 raise Exception("No init fitness value!")
-            current_fitness = self.init_fitness
-            for output, expected_output in zip(obtain_outputs, expected_outputs):
-                current_fitness = self._update(current_fitness, output, expected_output)
-            return current_fitness
+            return self.init_fitness - self._difference(obtain_outputs, expected_outputs)
         else:
             return numpy.min(episode_recorder) / float(episode_steps)
@@ -4,15 +4,16 @@ Name: NEAT evolved by Binary Search
 Function(s):
 Reproduction by Binary Search and Random Near Search.
 """
-import copy
-
-import math
-import pandas
-from sklearn.cluster import KMeans, SpectralClustering, Birch
+import numpy
+from scipy import sparse
+from sklearn.cluster import KMeans, MiniBatchKMeans, SpectralClustering, Birch
+from sklearn.decomposition import PCA, TruncatedSVD
+from sklearn.random_projection import SparseRandomProjection
 from neat.reproduction import DefaultReproduction
 from neat.config import DefaultClassConfig, ConfigParameter
 
-from ReverseEncodingTree.evolution.bean.genome import create_near_new, create_center_new, distance_between_two_matrices
+from ReverseEncodingTree.evolution.bean.feature_set import FeatureSet
+from ReverseEncodingTree.evolution.bean.genome import create_near_new, create_center_new
 
 
 class Reproduction(DefaultReproduction):
@@ -23,6 +24,8 @@ class Reproduction(DefaultReproduction):
         self.genome_config = None
         self.genome_type = None
         self.global_rate = None
+        # flattened cluster centers of the last generation.
+        self.cluster_centers = None
 
     @classmethod
     def parse_config(cls, param_dict):
@@ -38,7 +41,12 @@ class Reproduction(DefaultReproduction):
                                    ConfigParameter('min_distance', float, 0.2),
                                    ConfigParameter('correlation_rate', float, -0.5),
                                    ConfigParameter('search_count', int, 1),
-                                   ConfigParameter('cluster_method', str, "kmeans++")])
+                                   ConfigParameter('cluster_method', str, "kmeans++"),
+                                   ConfigParameter('pivot_count', int, 0),
+                                   ConfigParameter('search_mode', str, "serial"),
+                                   ConfigParameter('warm_start', bool, False),
+                                   ConfigParameter('projection', str, "none"),
+                                   ConfigParameter('projection_dimension', int, 50)])
 
     def create_new(self, genome_type, genome_config, num_genomes):
         """
@@ -58,7 +66,7 @@ class Reproduction(DefaultReproduction):
         self.genome_type = genome_type
 
         new_genomes = {}
-        distance_matrix = [[float("inf") for _ in range(num_genomes - 1)] for _ in range(num_genomes - 1)]
+        new_set = FeatureSet(capacity=max(16, num_genomes))
 
         for created_index in range(num_genomes):
             key = next(self.genome_indexer)
@@ -66,14 +74,8 @@ class Reproduction(DefaultReproduction):
             count = 0
             while True:
                 genome.configure_new(genome_config)
-                min_distance = float("inf")
-                for check_index, new_genome in new_genomes.items():
-                    current_distance = genome.distance(new_genome, genome_config)
-                    distance_matrix[created_index - 1][check_index - 1] = current_distance
-                    distance_matrix[check_index - 1][created_index - 1] = current_distance
-                    if min_distance > current_distance:
-                        min_distance = current_distance
-                if min_distance >= self.reproduction_config.init_distance:
+                distances = new_set.distances_to(genome.feature_matrix)
+                if len(distances) == 0 or numpy.min(distances) >= self.reproduction_config.init_distance:
                     break
 
                 count += 1
@@ -83,6 +85,7 @@ class Reproduction(DefaultReproduction):
                                     "please reduce init_distance or try again!")
 
             new_genomes[key] = genome
+            new_set.add(genome, genome.feature_matrix, distances)
             self.ancestors[key] = tuple()
 
         return new_genomes
@@ -136,11 +139,11 @@ class Reproduction(DefaultReproduction):
         avg_adjusted_fitness = 0
 
         if len(current_genomes) > pop_size:
-            feature_matrices = []
-            for genome in current_genomes:
-                feature_matrices.append([])
-                for feature_slice in genome.feature_matrix:
-                    feature_matrices[-1] += copy.deepcopy(feature_slice)
+            if self.genome_config.feature_format == 'sparse':
+                feature_matrices = sparse.vstack([genome.feature_matrix.reshape((1, -1))
+                                                  for genome in current_genomes], format="csr")
+            else:
+                feature_matrices = numpy.stack([genome.feature_matrix.ravel() for genome in current_genomes])
 
             # cluster the current network based on the size of population.
             labels, centers = self.cluster(feature_matrices, pop_size, len(current_genomes))
@@ -176,38 +179,27 @@ class Reproduction(DefaultReproduction):
         :return: center genomes and near genomes.
         """
         if cluster_centers is not None:
-            saved_genomes = []
-            correlations = []
+            saved_genomes = [genome_cluster[0] for genome_cluster in genome_clusters]
+            cluster_sets = [FeatureSet.create(genome_cluster) for genome_cluster in genome_clusters]
 
             # analyze the correlation between fitting degree and spatial position (negative correlation normally).
-            for genome_cluster in genome_clusters:
-                distances = [0]
-                fitnesses = [genome_cluster[0].fitness]
-                saved_genomes.append(genome_cluster[0])
-                for index in range(1, len(genome_cluster)):
-                    distances.append(genome_cluster[0].distance(genome_cluster[index], self.genome_config))
-                    fitnesses.append(genome_cluster[index].fitness)
-
-                if len(fitnesses) > 1:
-                    correlations.append(round(pandas.Series(distances).corr(pandas.Series(fitnesses)), 2))
-                else:
-                    correlations.append(-1.00)
-
-                for index in range(len(correlations)):
-                    if math.isnan(correlations[index]):
-                        correlations[index] = 0
+            correlations = self.obtain_correlations(genome_clusters, cluster_sets)
 
             print("Correlations: " + str(correlations))
 
             new_genomes = []
+            # the genomes saved in this population, and the distances between the leaders of clusters.
+            saved_set = FeatureSet.create(saved_genomes, self.reproduction_config.pivot_count)
+            leader_distances = numpy.array(saved_set.distance_matrix())
+
             # construct the topology of the phenotypical network
-            for index_1 in range(pop_size):
+            cluster_count = min(pop_size, len(genome_clusters))
+            for index_1 in range(cluster_count):
                 cluster_1 = genome_clusters[index_1]
-                for index_2 in range(index_1 + 1, pop_size):
+                for index_2 in range(index_1 + 1, cluster_count):
                     cluster_2 = genome_clusters[index_2]
 
-                    if distance_between_two_matrices(cluster_1[0].feature_matrix, cluster_2[0].feature_matrix) \
-                            > self.reproduction_config.min_distance:
+                    if leader_distances[index_1, index_2] > self.reproduction_config.min_distance:
 
                         # If the two clusters both have highly correlations,
                         # it means that the current network of these two clusters has a better description of phenotype,
@@ -216,62 +208,54 @@ class Reproduction(DefaultReproduction):
                                 and correlations[index_2] >= self.reproduction_config.correlation_rate:
                             topo_genome = self.obtain_global_genome(cluster_centers[index_1],
                                                                     cluster_centers[index_2],
-                                                                    saved_genomes + new_genomes, -1)
+                                                                    [saved_set], -1)
                             if cluster_1[0].fitness > cluster_2[0].fitness:
                                 near_genome = self.obtain_near_genome(cluster_1[0],
-                                                                      saved_genomes + new_genomes + cluster_1, -1)
+                                                                      [saved_set, cluster_sets[index_1]], -1)
                             else:
                                 near_genome = self.obtain_near_genome(cluster_2[0],
-                                                                      saved_genomes + new_genomes + cluster_2, -1)
+                                                                      [saved_set, cluster_sets[index_2]], -1)
 
-                            if near_genome is not None:
-                                new_genomes.append(near_genome)
-                            if topo_genome is not None:
-                                new_genomes.append(topo_genome)
+                            self.save_genome(near_genome, new_genomes, saved_set)
+                            self.save_genome(topo_genome, new_genomes, saved_set)
 
                         elif correlations[index_1] >= self.reproduction_config.correlation_rate > correlations[index_2]:
                             if cluster_1[0].fitness > cluster_2[0].fitness:
                                 near_genome_1 = self.obtain_near_genome(cluster_1[0],
-                                                                        saved_genomes + new_genomes + cluster_1, -1)
+                                                                        [saved_set, cluster_sets[index_1]], -1)
                                 near_genome_2 = self.obtain_near_genome(cluster_2[0],
-                                                                        saved_genomes + new_genomes + cluster_2, -1)
+                                                                        [saved_set, cluster_sets[index_2]], -1)
                             else:
                                 near_genome_1 = self.obtain_near_genome(cluster_2[0],
-                                                                        saved_genomes + new_genomes + cluster_2, -1)
+                                                                        [saved_set, cluster_sets[index_2]], -1)
                                 near_genome_2 = self.obtain_near_genome(cluster_2[0],
-                                                                        saved_genomes + new_genomes + cluster_2, -1)
+                                                                        [saved_set, cluster_sets[index_2]], -1)
 
-                            if near_genome_1 is not None:
-                                new_genomes.append(near_genome_1)
-                            if near_genome_2 is not None:
-                                new_genomes.append(near_genome_2)
+                            self.save_genome(near_genome_1, new_genomes, saved_set)
+                            self.save_genome(near_genome_2, new_genomes, saved_set)
 
                         elif correlations[index_2] >= self.reproduction_config.correlation_rate > correlations[index_1]:
                             if cluster_1[0].fitness > cluster_2[0].fitness:
                                 near_genome_1 = self.obtain_near_genome(cluster_1[0],
-                                                                        saved_genomes + new_genomes + cluster_1, -1)
+                                                                        [saved_set, cluster_sets[index_1]], -1)
                                 near_genome_2 = self.obtain_near_genome(cluster_1[0],
-                                                                        saved_genomes + new_genomes + cluster_1, -1)
+                                                                        [saved_set, cluster_sets[index_1]], -1)
 
                             else:
                                 near_genome_1 = self.obtain_near_genome(cluster_1[0],
-                                                                        saved_genomes + new_genomes + cluster_1, -1)
+                                                                        [saved_set, cluster_sets[index_1]], -1)
                                 near_genome_2 = self.obtain_near_genome(cluster_2[0],
-                                                                        saved_genomes + new_genomes + cluster_2, -1)
+                                                                        [saved_set, cluster_sets[index_2]], -1)
 
-                            if near_genome_1 is not None:
-                                new_genomes.append(near_genome_1)
-                            if near_genome_2 is not None:
-                                new_genomes.append(near_genome_2)
+                            self.save_genome(near_genome_1, new_genomes, saved_set)
+                            self.save_genome(near_genome_2, new_genomes, saved_set)
                         else:
                             near_genome_1 = self.obtain_near_genome(cluster_1[0],
-                                                                    saved_genomes + new_genomes + cluster_1, -1)
+                                                                    [saved_set, cluster_sets[index_1]], -1)
                             near_genome_2 = self.obtain_near_genome(cluster_2[0],
-                                                                    saved_genomes + new_genomes + cluster_2, -1)
-                            if near_genome_1 is not None:
-                                new_genomes.append(near_genome_1)
-                            if near_genome_2 is not None:
-                                new_genomes.append(near_genome_2)
+                                                                    [saved_set, cluster_sets[index_2]], -1)
+                            self.save_genome(near_genome_1, new_genomes, saved_set)
+                            self.save_genome(near_genome_2, new_genomes, saved_set)
 
             new_genomes += saved_genomes
         else:
@@ -280,27 +264,74 @@ class Reproduction(DefaultReproduction):
             for genome_cluster in genome_clusters:
                 new_genomes.append(genome_cluster[0])
 
+            new_set = FeatureSet.create(new_genomes, self.reproduction_config.pivot_count)
+
+            # the saved genomes are also compared when there are less leaders than the population size,
+            # so the distances are obtained from the feature set which grows with them.
             for index_1 in range(pop_size):
+                if index_1 >= len(new_genomes):
+                    break
                 genome_1 = new_genomes[index_1]
                 for index_2 in range(index_1 + 1, pop_size):
+                    if index_2 >= len(new_genomes):
+                        break
                     genome_2 = new_genomes[index_2]
 
-                    if genome_1.distance(genome_2, self.genome_config) > self.reproduction_config.min_distance:
+                    if new_set.distance(genome_1, genome_2) > self.reproduction_config.min_distance:
                         # add near genome (limit search count)
-                        near_genome = self.obtain_near_genome(genome_1, new_genomes, -1)
+                        near_genome = self.obtain_near_genome(genome_1, [new_set], -1)
                         # add center genome
                         topo_genome = self.obtain_global_genome(genome_1.feature_matrix, genome_2.feature_matrix,
-                                                                new_genomes, -1)
-                        if near_genome is not None:
-                            new_genomes.append(near_genome)
-                        if topo_genome is not None:
-                            new_genomes.append(topo_genome)
+                                                                [new_set], -1)
+                        self.save_genome(near_genome, new_genomes, new_set)
+                        self.save_genome(topo_genome, new_genomes, new_set)
 
         return new_genomes
 
+    @staticmethod
+    def obtain_correlations(genome_clusters, cluster_sets):
+        """
+        obtain the correlation coefficients between the distances to the leader and the fitnesses in each cluster.
+        The coefficients of all the clusters are calculated together by the sums over their members.
+
+        :param genome_clusters: genome clusters, the leader is the first genome in each cluster.
+        :param cluster_sets: feature sets of the genome clusters.
+
+        :return: correlation coefficients rounded to 2 decimals
+                 (-1 for the cluster with one genome, 0 if the coefficient is undefined).
+        """
+        labels, distances, fitnesses = [], [], []
+        for index, (genome_cluster, cluster_set) in enumerate(zip(genome_clusters, cluster_sets)):
+            cluster_distances = cluster_set.distances_to(genome_cluster[0].feature_matrix)
+            cluster_distances[0] = 0
+            labels.append(numpy.full(len(genome_cluster), index))
+            distances.append(cluster_distances)
+            fitnesses.append([genome.fitness for genome in genome_cluster])
+
+        labels = numpy.concatenate(labels)
+        distances = numpy.concatenate(distances).astype(float)
+        fitnesses = numpy.concatenate(fitnesses).astype(float)
+
+        # Pearson correlation coefficients by the centered sums of each cluster.
+        cluster_count = len(genome_clusters)
+        counts = numpy.bincount(labels, minlength=cluster_count)
+        distances -= (numpy.bincount(labels, distances, cluster_count) / counts)[labels]
+        fitnesses -= (numpy.bincount(labels, fitnesses, cluster_count) / counts)[labels]
+        covariances = numpy.bincount(labels, distances * fitnesses, cluster_count)
+        variances = numpy.bincount(labels, distances ** 2, cluster_count) * \
+            numpy.bincount(labels, fitnesses ** 2, cluster_count)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            correlations = numpy.round(covariances / numpy.sqrt(variances), 2)
+
+        correlations[numpy.isnan(correlations)] = 0
+        correlations[counts == 1] = -1.00
+        return correlations.tolist()
+
     def cluster(self, feature_matrices, pop_size, iteration):
         """
         cluster the current network based on the size of population using Cluster Method.
+        If warm_start is set, the k-means methods start from the cluster centers of the last generation.
+        If projection is set, the feature matrices are clustered in lower dimension, see project.
 
         :param feature_matrices: set of feature matrix (one dimensio).
         :param pop_size: population size.
@@ -308,9 +339,10 @@ class Reproduction(DefaultReproduction):
 
         :return: labels and cluster centers.
         """
-        centers = []
         if self.reproduction_config.cluster_method == "kmeans++":
             method = KMeans(n_clusters=pop_size, max_iter=iteration)
+        elif self.reproduction_config.cluster_method == "minibatch":
+            method = MiniBatchKMeans(n_clusters=pop_size, max_iter=iteration)
         elif self.reproduction_config.cluster_method == "spectral":
             method = SpectralClustering(n_clusters=pop_size)
         elif self.reproduction_config.cluster_method == "birch":
@@ -318,58 +350,184 @@ class Reproduction(DefaultReproduction):
         else:
             method = KMeans(n_clusters=pop_size, max_iter=iteration, init="random")
 
-        method.fit(feature_matrices)
-        for cluster_center in method.cluster_centers_:
-            feature_matrix = []
-            for index in range(self.genome_config.max_node_num):
-                feature_matrix.append(list(cluster_center[index * self.genome_config.max_node_num:
-                                                          (index + 1) * self.genome_config.max_node_num + 1]))
-            centers.append(feature_matrix)
+        projected_matrices, transform = self.project(feature_matrices)
+
+        # start the k-means methods from the (projected) centers of the last generation.
+        last_centers = self.cluster_centers
+        if self.reproduction_config.warm_start and isinstance(method, (KMeans, MiniBatchKMeans)) \
+                and last_centers is not None and last_centers.shape == (pop_size, feature_matrices.shape[1]):
+            if transform is not None:
+                last_centers = transform(last_centers)
+            method.set_params(init=numpy.asarray(last_centers, dtype=projected_matrices.dtype), n_init=1)
+
+        method.fit(projected_matrices)
+        if hasattr(method, "cluster_centers_") and transform is None:
+            self.cluster_centers = numpy.asarray(method.cluster_centers_)
+        else:
+            # spectral clustering and birch do not have the centers of final clusters,
+            # and the projected centers are not feature matrices, so they are the means of members.
+            self.cluster_centers = self.obtain_member_centers(feature_matrices, method.labels_, pop_size)
+
+        # each flattened center is a feature matrix with max_node_num rows (bias + weights).
+        node_num = self.genome_config.max_node_num
+        centers = list(self.cluster_centers.reshape((pop_size, node_num, node_num + 1)))
 
         return method.labels_, centers
 
-    def obtain_global_genome(self, matrix_1, matrix_2, saved_genomes, index):
+    def project(self, feature_matrices):
+        """
+        project the feature matrices into lower dimension before clustering, by the projection method:
+        'none', 'pca' (truncated SVD for the sparse matrices), 'random' (sparse random projection)
+        or 'nonzero' (drop the columns which are zero in all the feature matrices).
+
+        :param feature_matrices: set of feature matrix (one dimension, dense or sparse).
+
+        :return: projected feature matrices and the transform of other matrices (None if they are not projected).
+        """
+        projection = self.reproduction_config.projection
+        if projection == "none":
+            return feature_matrices, None
+
+        if projection == "nonzero":
+            if sparse.issparse(feature_matrices):
+                columns = numpy.flatnonzero(feature_matrices.getnnz(axis=0))
+            else:
+                columns = numpy.flatnonzero(numpy.any(feature_matrices != 0, axis=0))
+            return feature_matrices[:, columns], lambda matrices: matrices[:, columns]
+
+        sample_count, dimension = feature_matrices.shape
+        dimension = min(self.reproduction_config.projection_dimension, dimension)
+        if projection == "pca" and sparse.issparse(feature_matrices):
+            model = TruncatedSVD(n_components=min(dimension, feature_matrices.shape[1] - 1))
+        elif projection == "pca":
+            model = PCA(n_components=min(dimension, sample_count))
+        elif projection == "random":
+            model = SparseRandomProjection(n_components=dimension, dense_output=True)
+        else:
+            raise RuntimeError("Invalid projection {!r}".format(projection))
+
+        return model.fit_transform(feature_matrices), model.transform
+
+    @staticmethod
+    def obtain_member_centers(feature_matrices, labels, cluster_count):
+        """
+        obtain the centers of clusters by the means of their members.
+
+        :param feature_matrices: set of feature matrix (one dimension, dense or sparse).
+        :param labels: cluster labels of the feature matrices.
+        :param cluster_count: number of clusters.
+
+        :return: flattened cluster centers.
+        """
+        member_count = len(labels)
+        indicators = sparse.csr_matrix((numpy.ones(member_count), (labels, numpy.arange(member_count))),
+                                       shape=(cluster_count, member_count))
+        sums = indicators.dot(feature_matrices)
+        if sparse.issparse(sums):
+            sums = sums.toarray()
+
+        counts = numpy.maximum(numpy.bincount(labels, minlength=cluster_count), 1)
+        return numpy.asarray(sums) / counts[:, numpy.newaxis]
+
+    def obtain_global_genome(self, matrix_1, matrix_2, saved_sets, index):
         """
         obtain global genome based on the feather matrix in two genomes.
 
         :param matrix_1: one feature matrix.
         :param matrix_2: another feature matrix.
-        :param saved_genomes: genomes are saved in this population before.
+        :param saved_sets: feature sets of the genomes saved in this population before.
         :param index: genome index.
 
         :return: novel global (binary search) genome or not (cannot create due to min_distance).
         """
         center_genome = create_center_new(matrix_1, matrix_2, self.genome_config, index)
-        is_input = True
-        for check_genome in saved_genomes:
-            if center_genome.distance(check_genome, self.genome_config) < self.reproduction_config.min_distance:
-                is_input = False
-
-        if is_input:
+        if self.is_novel(center_genome, saved_sets):
             return center_genome
 
         return None
 
-    def obtain_near_genome(self, parent_genome, saved_genomes, index):
+    def obtain_near_genome(self, parent_genome, saved_sets, index):
         """
         obtain near genome by NEAT.
 
         :param parent_genome: parent genome.
-        :param saved_genomes: genomes are saved in this population before.
+        :param saved_sets: feature sets of the genomes saved in this population before.
         :param index: genome index.
 
         :return: novel near genome or not (cannot create due to min_distance).
         """
+        if self.reproduction_config.search_mode == "batch":
+            return self.obtain_near_genome_batch(parent_genome, saved_sets, index)
+
         count = 0
         while count < self.reproduction_config.search_count:
             near_genome = create_near_new(parent_genome, self.genome_config, index)
-            is_input = True
-            for check_genome in saved_genomes:
-                if near_genome.distance(check_genome, self.genome_config) < self.reproduction_config.min_distance:
-                    is_input = False
-            if is_input:
+            if self.is_novel(near_genome, saved_sets, parent_genome):
                 return near_genome
 
             count += 1
 
         return None
+
+    def obtain_near_genome_batch(self, parent_genome, saved_sets, index):
+        """
+        obtain near genome by NEAT, all the candidates are created at once and checked by one distance calculation.
+
+        :param parent_genome: parent genome.
+        :param saved_sets: feature sets of the genomes saved in this population before.
+        :param index: genome index.
+
+        :return: first novel near genome or not (cannot create due to min_distance).
+        """
+        near_genomes = [create_near_new(parent_genome, self.genome_config, index)
+                        for _ in range(self.reproduction_config.search_count)]
+        feature_matrices = [near_genome.feature_matrix for near_genome in near_genomes]
+
+        novelties = numpy.ones(len(near_genomes), dtype=bool)
+        for saved_set in saved_sets:
+            if len(saved_set) > 0 and numpy.any(novelties):
+                distances = saved_set.distances_between(feature_matrices)
+                novelties &= numpy.min(distances, axis=1) >= self.reproduction_config.min_distance
+
+        novel_indices = numpy.where(novelties)[0]
+        if len(novel_indices) > 0:
+            return near_genomes[novel_indices[0]]
+
+        return None
+
+    def is_novel(self, genome, saved_sets, parent_genome=None):
+        """
+        check whether the genome is not near the saved genomes.
+
+        :param genome: checked genome.
+        :param saved_sets: feature sets of the genomes saved in this population before.
+        :param parent_genome: parent genome of the checked genome (or None),
+                              the distances are updated from the parent by the changed cells if it is saved.
+
+        :return: whether all the distances are not less than min_distance.
+        """
+        for saved_set in saved_sets:
+            if len(saved_set) == 0:
+                continue
+
+            if parent_genome in saved_set and genome.feature_changes is not None:
+                distances = saved_set.distances_from(parent_genome, genome.feature_matrix, genome.feature_changes)
+                if numpy.min(distances) < self.reproduction_config.min_distance:
+                    return False
+            elif saved_set.has_within(genome.feature_matrix, self.reproduction_config.min_distance):
+                return False
+
+        return True
+
+    @staticmethod
+    def save_genome(genome, new_genomes, saved_set):
+        """
+        save the novel genome in this population.
+
+        :param genome: novel genome or None.
+        :param new_genomes: new genomes of this population.
+        :param saved_set: feature set of the genomes saved in this population.
+        """
+        if genome is not None:
+            new_genomes.append(genome)
+            saved_set.add(genome, genome.feature_matrix)
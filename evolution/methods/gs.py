@@ -11,24 +11,19 @@ from ReverseEncodingTree.evolution.methods import bi
 
 class Reproduction(bi.Reproduction):
 
-    def obtain_global_genome(self, matrix_1, matrix_2, saved_genomes, index):
+    def obtain_global_genome(self, matrix_1, matrix_2, saved_sets, index):
         """
         obtain global genome based on the feather matrix in two genomes.
 
         :param matrix_1: one feature matrix.
         :param matrix_2: another feature matrix.
-        :param saved_genomes: genomes are saved in this population before.
+        :param saved_sets: feature sets of the genomes saved in this population before.
         :param index: genome index.
 
         :return: novel global (golden-section search) genome or not (cannot create due to min_distance).
         """
         center_genome = create_golden_section_new(matrix_1, matrix_2, self.genome_config, index)
-        is_input = True
-        for check_genome in saved_genomes:
-            if center_genome.distance(check_genome, self.genome_config) < self.reproduction_config.min_distance:
-                is_input = False
-
-        if is_input:
+        if self.is_novel(center_genome, saved_sets):
             return center_genome
 
         return None
@@ -54,7 +54,7 @@ setup(
     },
     package_dir={"ReverseEncodingTree": "."},
     install_requires=[
-        "numpy", "matplotlib", "graphviz", "neat-python", "sklearn", "gym", "six", "pandas"
+        "numpy", "matplotlib", "graphviz", "neat-python", "sklearn", "gym", "six"
     ],
     license="Apache",
     classifiers=[
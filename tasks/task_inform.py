@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import partial
 
 import gym
 from neat import config, genome, reproduction, species, stagnation
@@ -6,7 +7,8 @@ from neat import config, genome, reproduction, species, stagnation
 import ReverseEncodingTree.evolution.bean.genome as autogenome
 import ReverseEncodingTree.evolution.bean.species_set as autospecies
 
-from ReverseEncodingTree.evolution.evolutor import TypeCorrect, EvalType
+from ReverseEncodingTree.evolution.bean.environment import CartPole_v0_Environment, VectorEnvironment
+from ReverseEncodingTree.evolution.evolutor import TypeCorrect, EvalType, InferenceType, NetType
 from ReverseEncodingTree.evolution.evolutor import FitDevice, FitProcess
 from ReverseEncodingTree.evolution.methods import bi, gs
 from ReverseEncodingTree.utils.operator import Operator
@@ -31,6 +33,30 @@ class GameType(Enum):
     LunarLander_v2 = 1
 
 
+def create_environment(game_type, vectorized=False):
+    """
+    create the environment of game task.
+
+    :param game_type: the task type, CartPole_v0 or LunarLander_v2.
+    :param vectorized: whether the vectorized environment (for InferenceType.Population) is required.
+
+    :return: environment in gym library (or vectorized environment).
+    """
+    if vectorized:
+        if game_type == GameType.CartPole_v0:
+            return CartPole_v0_Environment()
+        elif game_type == GameType.LunarLander_v2:
+            return VectorEnvironment(partial(gym.make, "LunarLander-v2"))
+        raise Exception("no vectorized environment for " + str(game_type) + ".")
+
+    if game_type == GameType.CartPole_v0:
+        return gym.make("CartPole-v0").unwrapped
+    elif game_type == GameType.LunarLander_v2:
+        return gym.make("LunarLander-v2")
+
+    return None
+
+
 class Logic(object):
 
     def __init__(self, method_type, logic_type,
@@ -157,8 +183,8 @@ class Game(object):
 
     def __init__(self, method_type, game_type,
                  episode_steps, episode_generation, max_generation,
-                 attacker=None, noise_level=-1,
-                 display_results=False, checkpoint=-1, stdout=False):
+                 attacker=None, noise_level=-1, process_count=None, inference_type=InferenceType.Single,
+                 network_type=NetType.FeedForward, display_results=False, checkpoint=-1, stdout=False):
         """
         initialize the game task.
 
@@ -170,26 +196,29 @@ class Game(object):
                                if the generation exceeds the maximum, it will be terminated.
         :param attacker: noise attacker, see evolution/bean/attacker.py.
         :param noise_level: noise level.
+        :param process_count: number of processes to evaluate genomes in parallel.
+        :param inference_type: type of inference, InferenceType.Population rolls out the whole population together.
+        :param network_type: type of network created by genome, NetType.FeedForward or NetType.Recurrent.
         :param display_results: whether result visualization is required.
         :param checkpoint: check the statistics point.
         :param stdout: Whether outputting the genome information in the process is required.
         """
 
-        game_environment = None
+        vectorized = inference_type == InferenceType.Population
+        game_environment = create_environment(game_type, vectorized)
         if game_type == GameType.CartPole_v0:
-            game_environment = gym.make("CartPole-v0").unwrapped
             self.filename = "cart-pole-v0."
             self.node_name = {-1: 'In0', -2: 'In1', -3: 'In3', -4: 'In4', 0: 'act1', 1: 'act2'}
         elif game_type == GameType.LunarLander_v2:
-            game_environment = gym.make("LunarLander-v2")
             self.filename = "lunar-lander-v2."
             self.node_name = {-1: '1', -2: '2', -3: '3', -4: '4', -5: '5', -6: '6', -7: '7', -8: '8', 0: 'fire engine'}
 
-        fitter = FitDevice(FitProcess())
+        fitter = FitDevice(FitProcess(), network_type=network_type, inference_type=inference_type)
         fitter.set_environment(environment=game_environment,
                                input_type=TypeCorrect.List, output_type=TypeCorrect.Value,
                                episode_steps=episode_steps, episode_generation=episode_generation,
                                attacker=attacker, noise_level=noise_level)
+        fitter.set_parallel(process_count, environment_creator=partial(create_environment, game_type, vectorized))
         # load configuration.
         task_config = None
         if method_type == MethodType.N:
@@ -213,6 +242,9 @@ class Game(object):
                                         autospecies.StrongSpeciesSet, stagnation.DefaultStagnation,
                                         "../configures/task/" + self.filename)
 
+        # load the fidelity schedule of evaluation.
+        fitter.set_fidelity_by_file("../configures/task/" + self.filename)
+
         # initialize the NeuroEvolution
         self.operator = Operator(config=task_config, fitter=fitter, node_names=self.node_name,
                                  max_generation=max_generation, checkpoint_value=checkpoint, stdout=stdout,
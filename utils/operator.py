@@ -162,9 +162,10 @@ class Operator(object):
         :return: result in Supervised Learning.
         """
         if self._fitter.learn_type == LearnType.Supervised:
+            network = self.get_best_network()
             obtain_outputs = []
             for current_input in dataset.get("i"):
-                obtain_outputs.append(self._winner.activate(current_input))
+                obtain_outputs.append(network.activate(current_input))
 
             right = 0
             for obtain_output, expected_output in zip(obtain_outputs, dataset.get("o")):
@@ -264,6 +265,9 @@ class Operator(object):
             self._winner = pickle.load(file)
 
     def reset(self):
+        # restart the schedule of the fitter, like the fidelity schedule.
+        self._fitter.reset()
+
         while True:
             # noinspection PyBroadException
             try: